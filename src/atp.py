@@ -1,32 +1,74 @@
 import os
 import sys
+import time
 import argparse
-from collections import defaultdict
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
-from utils import load_pairs, most_freq, tolerance_principle, hamming_distance
+from utils import load_pairs, iter_pairs, iter_batches, tolerance_principle
 from tp_switch_statement import TPSwitchStatement
 from semantic_condition import SemanticCondition
 from phonological_condition import PhonologicalCondition
+from compiled_atp import CompiledATP
+from suffix_trie import SuffixTrie
+from ending_statistics import EndingStatistics
+from pair_store import PairStore
+from vocab import Vocab
+from case import Case, IDENTITY
+from update_state import UpdateState, NodeState
+from inflection_cache import InflectionCache
+from parallel_build import ParallelBuild
+from parallel_inference import inflect_batches
+from training_profile import TrainingProfile, NULL_NODE_PROFILE
+from inference_metrics import InferenceMetrics, MEMORIZED, PRODUCTIVE, GUESSED
+import model_io
 
 NEG_SYMBOL = '¬'
 
 class ATP:
-    def __init__(self, feature_space, apply_phonology=False):
+    def __init__(self, feature_space, apply_phonology=False, cache_size=0, collect_metrics=False, updatable=False):
         '''
         The main class for ATP.
+
+        :cache_size: if greater than 0, inflect and inflect_no_feat memoize up to this many of the most recently used inflections.
+            With a cache, features must be passed as tuples (or another hashable type).
+        :collect_metrics: if True, inflecting records InferenceMetrics (see inference_metrics.py) in self.metrics.
+            Inflections served from the cache are recorded too. inflect_no_feat also counts the leaves that the lemma is compatible with,
+            which takes a slower pass over the tree the first time a lemma ending is seen (see inflect_no_feat_uncached).
+        :updatable: if True, training keeps what ATP.update needs to add new pairs without retraining (see update_state.py), which takes memory for every node of the tree.
         '''
         self.feature_space = set(SemanticCondition(op) for op in feature_space)
         self.apply_phonology = apply_phonology # see tp_switch_statement.py for a description of this paramter. You should pretty much never need to set it to True.
+        self.cache = InflectionCache(cache_size) if cache_size > 0 else None
+        self.metrics = InferenceMetrics() if collect_metrics else None
+        self.updatable = updatable
+        self.update_state = None # the UpdateState of an updatable model, once it is trained
+        self.profile = None # the TrainingProfile of the current ATP.train, if it is being profiled
+        self.compatible_leaf_counts = dict() # maps a lemma ending to the number of leaves that inflect_no_feat chooses from for it (see summarize)
 
     class Node:
         '''
         A node in a decision tree.
         '''
-        def __init__(self, name, switch_statement=None):
+        def __init__(self, name, switch_statement=None, depth=0, productive=False):
+            '''
+            :name: the path to the node (and, for a leaf, its productive case)
+            :switch_statement: a leaf's TPSwitchStatement
+            :depth: the depth of the node in the tree
+            :productive: True iff the node is a leaf with a productive process
+            '''
             self.name = name
             self.left_child = None
             self.right_child = None
             self.switch_statement = switch_statement
+            self.depth = depth
+            self.productive = productive
+            # a summary of the subtree for inflect_no_feat (see ATP.summarize)
+            self.rank = None
+            self.best_leaf = None
+            self.best_productive_leaf = None
+            self.phonology_free = True
+            self.state = None # the NodeState that ATP.update builds on, if the model is updatable
 
         def add_child(self, left, branch_condition, child_node):
             '''
@@ -59,32 +101,164 @@ class ATP:
             '''
             return len(self.get_children())
 
-    def train(self, pairs):
+    def train(self, pairs, n_jobs=1, parallel_depth=2, profile=None):
         '''
         :pairs: pairs to train on 
+        :n_jobs: the number of processes to train with. If greater than 1, sibling subtrees are built in parallel by a pool of worker processes.
+        :parallel_depth: when training in parallel, the subtrees rooted at this depth are handed off to the workers. The nodes above it are built serially.
+        :profile: if not None, a TrainingProfile (see training_profile.py) to record where training spends its time in
         '''        
-        # build labels
-        tp = TPSwitchStatement(apply_phonology=self.apply_phonology, pairs=pairs)
-        labels = list()
-        for lemma, _, feats in pairs:
-            labels.append(tp.get_case(lemma, feats).name)
-
-        # recursivly build the decision tree
-        self.root = self.build_node(pairs, labels)
+        if self.cache is not None: # the cached inflections are from the previous tree
+            self.cache.clear()
+        self.profile = profile
+        try:
+            start = time.perf_counter()
+            pairs = list(pairs)
+            switch_statement = TPSwitchStatement(apply_phonology=self.apply_phonology, pairs=pairs)
+            labels = self.build_labels(pairs, switch_statement)
+            if profile is not None:
+                profile.time_step('labels', start)
+
+            # recursivly build the decision tree over a store of the pairs shared by all nodes
+            start = time.perf_counter()
+            store = PairStore(pairs, labels, conditions=self.feature_space)
+            if profile is not None:
+                profile.time_step('pair_store', start)
+            start = time.perf_counter()
+            if n_jobs > 1:
+                parallel = ParallelBuild(self, store, n_jobs=n_jobs, depth=max(parallel_depth, 1))
+                self.root = self.build_node(store, store.all_indices(), parallel=parallel)
+                parallel.join()
+            else:
+                self.root = self.build_node(store, store.all_indices())
+            if profile is not None:
+                profile.time_step('build_tree', start)
+            start = time.perf_counter()
+            self.summarize(self.root)
+            if profile is not None:
+                profile.time_step('summarize', start)
+            self.update_state = UpdateState(store, switch_statement) if self.updatable else None
+        finally:
+            self.profile = None
 
         return self # return the trained model
 
+    def update(self, new_pairs):
+        '''
+        Train on :new_pairs: in addition to the pairs that the model has already been trained on. The model must be updatable (see ATP.__init__).
+        The result is identical to training from scratch on all of the pairs (with :new_pairs: after the old ones),
+        but only the nodes that the new pairs reach are revisited, and each of them only counts the new pairs (see update_node).
+
+        :new_pairs: pairs to add to the training pairs
+        '''
+        assert(self.update_state is not None) # the model must have been trained with updatable=True (a loaded model does not keep its training pairs)
+        if self.cache is not None: # the cached inflections are from the previous tree
+            self.cache.clear()
+        store = self.update_state.store
+        start = len(store)
+        relabeled = self.update_state.add(list(new_pairs))
+        changed = None
+        if len(relabeled) > 0:
+            changed = np.zeros(len(store), dtype=bool)
+            changed[relabeled] = True
+        self.root = self.update_node(store, self.root, np.arange(start, len(store)), set(self.feature_space), changed)
+        self.summarize(self.root)
+
+        return self # return the updated model
+
+    def update_node(self, store, node, new_indices, split_options, changed=None):
+        '''
+        Add new pairs to a node of an updatable model's tree.
+        The node adds the new pairs to the statistics, switch statement, and split counts in its NodeState, and re-checks its productivity and its best split.
+        If it splits on the same feature as before, its children are updated with the new pairs that reach them; otherwise, its subtree is rebuilt.
+
+        :store: the PairStore of training pairs, which the new pairs have been added to
+        :node: the ATP.Node to update
+        :new_indices: an index array of the new pairs in :store: that reach the node
+        :split_options: the split options that the node would be built with now
+        :changed: if not None, a boolean array that is True for the pairs in :store: whose label changed
+
+        :return: the updated node, which is either :node: or a node that replaces it
+        '''
+        state = node.state
+        relabeled = changed is not None and changed[state.indices].any()
+        if len(new_indices) == 0 and state.split_options == split_options and not relabeled:
+            return node # the node would be built exactly as it was
+        indices = np.concatenate([state.indices, new_indices])
+        if relabeled: # the counts cannot be updated for pairs that changed label, so the subtree is rebuilt
+            return self.build_node(store, indices, split_options=set(split_options), path_string=state.path_string, depth=node.depth)
+        new_pairs = store.pairs_of(new_indices)
+        tp = state.switch_statement
+        state.ending_statistics.count(new_pairs, known=tp.vocab) # the switch statement's vocab is the distinct pairs counted so far
+        state.split_options = frozenset(split_options)
+        split_options = set(split_options)
+        split_options.update(self.phonological_features(None, None, state.ending_statistics))
+        state.count(store, indices, split_options)
+        split_options.difference_update(self.useless_splits(store, indices, split_options, state=state))
+
+        # check if productive
+        if state.default_position is not None: # put the productive case back among the cases, to train the switch statement further
+            tp.insert_case(state.default_position, tp.default_case)
+            tp.default_case = Case(IDENTITY)
+            state.default_position = None
+        tp.train(new_pairs)
+        productive = tp.get_productive()
+        if productive:
+            return self.productive_leaf(tp, productive, state.path_string, node.depth, state)
+        elif len(split_options) == 0:
+            return self.unproductive_leaf(tp, state.path_string, node.depth, state)
+
+        split_feature, mask = self.best_split(store, new_indices, split_options, state=state)
+        if node.num_children() == 0 or node.get_children()[0][0][1] != split_feature:
+            # the node was a leaf or split on another feature, so its subtree is rebuilt
+            return self.split_node(store, indices, split_feature, store.mask(split_feature, indices), split_options, state.path_string, state.ending_statistics, node.depth, state=state)
+        child_split_options = split_options.difference({split_feature})
+        for (pos, condition), child in node.get_children():
+            child_node = self.update_node(store, child, new_indices[mask] if pos else new_indices[~mask], child_split_options, changed)
+            node.add_child(left=pos, branch_condition=(pos, condition), child_node=child_node)
+        return node
+
+    def build_labels(self, pairs, switch_statement=None):
+        '''
+        :switch_statement: the TPSwitchStatement trained on :pairs:, if it has already been built
+
+        :return: an int array with the "label" of each of :pairs: (the label of the case that inflects it in a switch statement over all of the pairs)
+        '''
+        tp = switch_statement if switch_statement is not None else TPSwitchStatement(apply_phonology=self.apply_phonology, pairs=pairs)
+        get_case = tp.get_case
+        return np.fromiter((get_case(lemma, feats).label for lemma, _, feats in pairs), dtype=np.int64, count=len(pairs))
+
+    def compile(self):
+        '''
+        :return: a CompiledATP, a flat array-backed copy of the trained tree for fast inference.
+        '''
+        return CompiledATP(self.root)
+
+    def save(self, path):
+        '''
+        Save the trained model to :path: in a compact binary format (see model_io.py), so that it can be loaded without retraining.
+        '''
+        model_io.save(self, path)
+
+    @staticmethod
+    def load(path):
+        '''
+        :return: the ATP model saved at :path: by ATP.save
+        '''
+        return model_io.load(path)
+
     def accuracy(self, pairs, no_feats=False):
         '''
-        :pairs: pairs to compute accuracy over
+        :pairs: pairs to compute accuracy over, which can be any iterable (e.g., a stream from utils.iter_pairs), since they are read once
         '''
-        c, t = 0, 0
+        lemmas, features, gold = list(), list(), list()
         for lemma, inflected, feats in pairs:
-            if no_feats:
-                feats = ()
-            if self.inflect(lemma, feats) == inflected:
-                c += 1
-            t += 1
+            lemmas.append(lemma)
+            features.append(() if no_feats else feats)
+            gold.append(inflected)
+        preds, _ = self.inflect_many(lemmas, features)
+        c = sum(pred == inflected for pred, inflected in zip(preds, gold))
+        t = len(gold)
         return c / t if t > 0 else 0
 
     def guess_inflection(self, lemma, best_node):
@@ -94,10 +268,7 @@ class ATP:
 
         :return: an inflected form using the nearest-neighbor at the :best_node: (using Hamming distance).
         '''
-        options = sorted(best_node.switch_statement.vocab, key=lambda it: hamming_distance(lemma, it[0]))
-        closest_lemma, closest_inflected = options[0][:-1]
-        suffix_of_closest = closest_inflected[len(closest_lemma):]
-        return f'{lemma}{suffix_of_closest}'
+        return best_node.switch_statement.guess(lemma)
 
     def inflect(self, lemma, features, return_whether_guess=False):
         '''
@@ -107,21 +278,30 @@ class ATP:
         :features: the features specifying which inflection to produce
         :return_whether_guess: if True, it will also return a boolean specifying whether guessing was required
         '''
+        if self.metrics is not None:
+            start = time.perf_counter()
+            res = self.cached('inflect', self.inflect_uncached, lemma, features)
+            self.metrics.observe_latency('inflect', time.perf_counter() - start)
+        else:
+            res = self.cached('inflect', self.inflect_uncached, lemma, features)
+        if res is None:
+            return None
+        pred, was_guess = res
+        if return_whether_guess:
+            return pred, was_guess
+        return pred
+
+    def inflect_uncached(self, lemma, features):
+        '''
+        Inflect a lemma without consulting the cache.
+
+        :return: a tuple (inflected form, whether guessing was required, leaf, outcome, None), as recorded by cached
+        '''
         frontier = [self.root]
         while len(frontier) != 0:
             node = frontier.pop()
             if node.num_children() == 0:
-                # if there is a productive process apply it. Or if the (lemma, features) was memorized.
-                if node.switch_statement.productive or node.switch_statement.memorized(lemma, features):
-                    pred = node.switch_statement.inflect(lemma, features)
-                    if return_whether_guess:
-                        return pred, False
-                    return pred
-                else: # otherwise guess an inflection
-                    guess = self.guess_inflection(lemma, node)
-                    if return_whether_guess:
-                        return guess, True
-                    return guess
+                return self.leaf_inflection(lemma, features, node) + (None,)
             else:
                 for child_branch_condition, child in node.get_children():
                     pos, condition = child_branch_condition
@@ -129,6 +309,35 @@ class ATP:
                         frontier.append(child)
         print('*** ERROR ***')
 
+    def cached(self, mode, inflect, lemma, features):
+        '''
+        Inflect a lemma through the cache, if the model has one, and record the inflection in the metrics, if the model collects them.
+        The cache keeps the whole result of :inflect:, so that inflections served from the cache are recorded just like those that reach a leaf.
+
+        :mode: the name of the entry point, which is part of the cache key
+        :inflect: the uncached function to call on a miss, which returns a tuple
+            (inflected form, whether guessing was required, leaf, outcome, number of compatible leaves or None if they are not counted)
+
+        :return: a tuple (inflected form, whether guessing was required), or None if :inflect: failed
+        '''
+        if self.cache is None:
+            res = inflect(lemma, features)
+        else:
+            key = (lemma, features, mode)
+            res = self.cache.get(key)
+            if res is None:
+                res = inflect(lemma, features)
+                if res is not None:
+                    self.cache.put(key, res)
+        if res is None:
+            return None
+        if self.metrics is not None:
+            _, _, leaf, outcome, num_compatible = res
+            self.metrics.observe_leaf(leaf, outcome)
+            if num_compatible is not None:
+                self.metrics.observe_compatible_leaves(num_compatible)
+        return res[:2]
+
     def inflect_no_feat(self, lemma, features, return_whether_guess=False):
         '''
         Inflect a lemma while ignoring a particular feature (i.e., allowing the features to contain any of that features values).
@@ -139,42 +348,187 @@ class ATP:
         :vals_of_feat: 
         :return_whether_guess: if True, it will also return a boolean specifying whether guessing was required
         '''
+        if self.metrics is not None:
+            start = time.perf_counter()
+            pred, was_guess = self.cached('inflect_no_feat', self.inflect_no_feat_uncached, lemma, features)
+            self.metrics.observe_latency('inflect_no_feat', time.perf_counter() - start)
+        else:
+            pred, was_guess = self.cached('inflect_no_feat', self.inflect_no_feat_uncached, lemma, features)
+        if return_whether_guess:
+            return pred, was_guess
+        return pred
+
+    def inflect_no_feat_uncached(self, lemma, features):
+        '''
+        Inflect a lemma while ignoring features, without consulting the cache.
+        Of the leaves that the lemma's phonology is compatible with, the deepest productive leaf is chosen (or the deepest leaf, if none is productive),
+        with ties going to the leaf with the most vocab. The traversal keeps a running best, skipping subtrees that cannot improve on it.
+        If the model collects metrics, the compatible leaves are also counted. The count only depends on the lemma's ending, so it is kept for each ending,
+        and only the first lemma with an ending is counted, in the same traversal (which then cannot skip subtrees that have compatible leaves,
+        while a phonology-free subtree adds its number of leaves without being visited).
+
+        :return: a tuple (inflected form, whether guessing was required, leaf, outcome, number of compatible leaves or None if metrics are not collected)
+        '''
+        count = False
+        num_compatible = None
+        if self.metrics is not None:
+            ending = lemma[-self.root.ending_length:] if self.root.ending_length > 0 else ''
+            num_compatible = self.compatible_leaf_counts.get(ending)
+            if num_compatible is None:
+                count = True
+                num_compatible = 0
+        best, best_productive = None, None
         frontier = [self.root]
-        valid_leaves = list()
         while len(frontier) != 0:
             node = frontier.pop()
-            if node.num_children() == 0:
-                valid_leaves.append(node)
+            if not count:
+                if best_productive is not None:
+                    if not ATP.better_leaf(node.best_productive_leaf, best_productive):
+                        continue # the subtree has no better productive leaf
+                elif node.best_productive_leaf is None and not ATP.better_leaf(node.best_leaf, best):
+                    continue # the subtree has no productive leaf, nor a better unproductive one
+            if node.phonology_free: # every leaf of the subtree is compatible, so its summary is the answer for it
+                if count:
+                    num_compatible += node.num_leaves
+                if ATP.better_leaf(node.best_leaf, best):
+                    best = node.best_leaf
+                if ATP.better_leaf(node.best_productive_leaf, best_productive):
+                    best_productive = node.best_productive_leaf
             else:
                 for child_branch_condition, child in node.get_children():
                     pos, condition = child_branch_condition
                     if condition.condition_type == 'Semantic' or (pos and condition.applies(lemma, features)) or (not pos and not condition.applies(lemma, features)):
                         frontier.append(child)
+        if count:
+            self.compatible_leaf_counts[ending] = num_compatible
         # choose a node
-        node = None
-        valid_productive_leaves = list(filter(lambda it: not it.name.endswith('No Productive Process'), valid_leaves))
-        if len(valid_leaves) == 1:
-            node = valid_leaves[0]
-        elif len(valid_productive_leaves) == 1:
-            node = valid_productive_leaves[0]
-        elif len(valid_productive_leaves) > 0:
-            # get deepest node
-            node = sorted(valid_productive_leaves, reverse=True, key=lambda it: (it.name.count(','), len(it.switch_statement.vocab)))[0]
-        else:
-            assert(len(valid_productive_leaves) == 0)
-            # get deepest node
-            node = sorted(valid_leaves, reverse=True, key=lambda it: (it.name.count(','), len(it.switch_statement.vocab)))[0]
-
-        if node.switch_statement.productive or node.switch_statement.memorized(lemma, features):
-            pred = node.switch_statement.inflect(lemma, features)
-            if return_whether_guess:
-                return pred, False
-            return pred
-        else:
-            guess = self.guess_inflection(lemma, node)
-            if return_whether_guess:
-                return guess, True
-            return guess
+        node = best_productive if best_productive is not None else best
+        return self.leaf_inflection(lemma, features, node) + (num_compatible,)
+
+    @staticmethod
+    def better_leaf(leaf, best):
+        '''
+        :return: True iff :leaf: should replace :best: as the leaf chosen by inflect_no_feat, where :best: comes first in the traversal (or is None).
+        '''
+        return leaf is not None and (best is None or leaf.rank > best.rank)
+
+    def summarize(self, node):
+        '''
+        Summarize the subtree of :node: for inflect_no_feat: the leaves it would choose from the subtree if every leaf were compatible with the lemma,
+        whether the subtree is phonology-free (i.e., only branches on semantic conditions, which inflect_no_feat ignores), its number of leaves,
+        and the length of the longest ending that it branches on (so the leaves that a lemma is compatible with only depend on that many of its final characters).
+        '''
+        if node is self.root: # the tree changed, so the compatible leaves counted for it are stale
+            self.compatible_leaf_counts = dict()
+        if node.num_children() == 0:
+            node.rank = (node.depth, len(node.switch_statement.vocab))
+            node.best_leaf = node
+            node.best_productive_leaf = node if node.productive else None
+            node.phonology_free = True
+            node.num_leaves = 1
+            node.ending_length = 0
+            return
+        node.best_leaf = node.best_productive_leaf = None
+        node.phonology_free = True
+        node.num_leaves = 0
+        node.ending_length = 0
+        for (_, condition), child in reversed(node.get_children()): # the order that inflect_no_feat visits the children
+            self.summarize(child)
+            node.num_leaves += child.num_leaves
+            node.ending_length = max(node.ending_length, child.ending_length)
+            if condition.condition_type == 'Phonological':
+                node.ending_length = max(node.ending_length, len(condition.ending) if condition.singleton else max(map(len, condition.ending)))
+            node.phonology_free = node.phonology_free and condition.condition_type == 'Semantic' and child.phonology_free
+            if ATP.better_leaf(child.best_leaf, node.best_leaf):
+                node.best_leaf = child.best_leaf
+            if ATP.better_leaf(child.best_productive_leaf, node.best_productive_leaf):
+                node.best_productive_leaf = child.best_productive_leaf
+
+    def inflect_at_leaf(self, lemma, features, node):
+        '''
+        Inflect a lemma with the switch statement of the leaf :node:, recording the inflection in the metrics, if the model collects them.
+
+        :return: a tuple (inflected form, whether guessing was required)
+        '''
+        pred, was_guess, _, outcome = self.leaf_inflection(lemma, features, node)
+        if self.metrics is not None:
+            self.metrics.observe_leaf(node, outcome)
+        return pred, was_guess
+
+    def leaf_inflection(self, lemma, features, node):
+        '''
+        Inflect a lemma with the switch statement of the leaf :node:.
+
+        :return: a tuple (inflected form, whether guessing was required, :node:, outcome), where the outcome is MEMORIZED, PRODUCTIVE, or GUESSED
+        '''
+        # if the (lemma, features) was memorized, or there is a productive process, apply it
+        tp = node.switch_statement
+        case = tp.lookup(lemma, features)
+        if case is not None:
+            return case.inflect(lemma), False, node, MEMORIZED
+        if tp.productive:
+            return tp.default_case.inflect(lemma), False, node, PRODUCTIVE
+        # otherwise guess an inflection
+        return self.guess_inflection(lemma, node), True, node, GUESSED
+
+    def inflect_many(self, lemmas, features):
+        '''
+        Inflect a batch of lemmas. The whole batch is routed down the tree together:
+        at each internal node, the batch is split by the node's branch condition in a single pass.
+
+        :lemmas: a list of lemmas to inflect
+        :features: a list of feature tuples, aligned with :lemmas:
+
+        :return: a tuple (inflected forms, whether guessing was required) of lists aligned with :lemmas:
+        '''
+        assert(len(lemmas) == len(features))
+        start = time.perf_counter()
+        preds = [None] * len(lemmas)
+        guesses = [False] * len(lemmas)
+        frontier = [(self.root, range(len(lemmas)))]
+        while len(frontier) != 0:
+            node, indices = frontier.pop()
+            if len(indices) == 0:
+                continue
+            if node.num_children() == 0:
+                for i in indices:
+                    preds[i], guesses[i] = self.inflect_at_leaf(lemmas[i], features[i], node)
+            else:
+                # both children of a node branch on the same condition (one negated)
+                children = node.get_children()
+                _, condition = children[0][0]
+                applies, does_not_apply = condition.partition(lemmas, features, indices)
+                for child_branch_condition, child in children:
+                    pos, _ = child_branch_condition
+                    frontier.append((child, applies if pos else does_not_apply))
+        if self.metrics is not None:
+            self.metrics.observe_latency('inflect_many', time.perf_counter() - start)
+        return preds, guesses
+
+    def inflect_stream(self, pairs, batch_size=10000, n_jobs=1):
+        '''
+        Lazily inflect a stream of pairs in batches with inflect_many, so that memory stays flat however long the stream is.
+        While a batch is being inflected, the next one is read from :pairs: in a background thread.
+
+        :pairs: an iterable of (lemma, inflected, features) triples, such as utils.iter_pairs. The inflected forms are ignored.
+        :batch_size: the number of pairs to inflect at a time
+        :n_jobs: the number of processes to inflect with. If greater than 1, batches are inflected in parallel by a pool of worker processes (see parallel_inference.py).
+
+        :return: a generator of lists of inflected forms, one list per batch, in input order
+        '''
+        batches = iter_batches(pairs, batch_size)
+        if n_jobs > 1:
+            yield from inflect_batches(self, batches, n_jobs)
+            return
+        with ThreadPoolExecutor(max_workers=1) as reader:
+            future = reader.submit(next, batches, None)
+            while True:
+                batch = future.result()
+                if batch is None:
+                    return
+                future = reader.submit(next, batches, None) # read the next batch while inflecting this one
+                preds, _ = self.inflect_many([lemma for lemma, _, _ in batch], [feats for _, _, feats in batch])
+                yield preds
 
     def probe(self, lemma, features):
         '''
@@ -209,110 +563,199 @@ class ATP:
                     frontier.append(child)
         return leaves
 
-    def build_node(self, _pairs, _labels, split_options=None, path_string=''):
+    def build_node(self, store, indices, split_options=None, path_string='', ending_statistics=None, depth=0, parallel=None):
         '''
         A recursive method builds a node to grow a decision tree.
 
-        :_pairs: training pairs.
-        :labels: the "labels" (effectively suffixes) of the training pairs.
+        :store: the PairStore of training pairs and their "labels" (effectively suffixes).
+        :indices: an index array of the pairs in :store: that made it to this node.
         :split_options: features options for splitting on.
         :path_string: a string denoting the path taken so far.
+        :ending_statistics: the EndingStatistics of the pairs, if they have already been derived from the parent node.
+        :depth: the depth of the node.
+        :parallel: if training in parallel, the ParallelBuild that deep enough subtrees are handed off to.
         '''
         if split_options == None:
             split_options = set(self.feature_space)
-        lemma_ending_options = self.phonological_features(_pairs, _labels)
-        _names = set(it.name for it in split_options)
-        split_options.update(filter(lambda it: it.name not in _names, lemma_ending_options))
-        split_options.difference_update(self.get_useless_splits(split_options, _pairs, _labels))
+        # a no-op stand-in records nothing when training is not profiled
+        record = self.profile.start_node(path_string, depth, len(indices)) if self.profile is not None else NULL_NODE_PROFILE
+        state = NodeState(path_string, split_options) if self.updatable else None
+        _pairs = store.pairs_of(indices)
+        record.lap()
+        if ending_statistics is None:
+            ending_statistics = EndingStatistics(_pairs)
+        record.lap('ending_statistics')
+        lemma_ending_options = self.phonological_features(_pairs, None, ending_statistics)
+        record.lap('phonological_features')
+        split_options.update(lemma_ending_options) # conditions are compared by value, so existing options are kept
+        if state is not None: # count the pairs of each label that every candidate split applies to, which the splits are then scored from
+            state.ending_statistics = ending_statistics
+            state.count(store, indices, split_options)
+        split_options.difference_update(self.useless_splits(store, indices, split_options, state=state))
+        record.lap('useless_splits')
+        record.count(num_split_options=len(split_options), num_phonological_conditions=len(lemma_ending_options))
 
         # check if productive
         tp = TPSwitchStatement(apply_phonology=self.apply_phonology, pairs=_pairs)
         productive = tp.get_productive()
+        if state is not None:
+            state.switch_statement = tp
+        record.lap('tp_switch_statement')
         if productive: # productive
-            assert(tp.productive)
-            tp.default_case = productive
-            tp.cases.remove(productive)
-            return ATP.Node(f'{path_string} => {productive.name}', tp)
+            record.finish()
+            return self.productive_leaf(tp, productive, path_string, depth, state)
         elif len(split_options) == 0: # productive, but no features left
-            return ATP.Node(f'{path_string} => No Productive Process', tp)
+            node = self.unproductive_leaf(tp, path_string, depth, state)
+            record.lap('neighbor_index')
+            record.finish()
+            return node
 
         # maximize productivity via consistency
-        split_feature, splits, splits_labels = self.maximize_productivity(_pairs, _labels, split_options)
+        split_feature, mask = self.best_split(store, indices, split_options, state=state)
+        record.lap('best_split')
+        record.count(leaf=False)
+        return self.split_node(store, indices, split_feature, mask, split_options, path_string, ending_statistics, depth, parallel=parallel, state=state, record=record)
+
+    def productive_leaf(self, tp, productive, path_string, depth, state=None):
+        '''
+        :tp: the TPSwitchStatement of the pairs at the leaf
+        :productive: the case of :tp: that is productive, which becomes its default case
+        :state: the leaf's NodeState, if the model is updatable, which records where the default case was taken from
+
+        :return: a productive leaf
+        '''
+        assert(tp.productive)
+        position = tp.remove_case(productive)
+        tp.default_case = productive
+        node = ATP.Node(f'{path_string} => {productive.name}', tp, depth=depth, productive=True)
+        if state is not None:
+            state.default_position = position
+        node.state = state
+        return node
+
+    def unproductive_leaf(self, tp, path_string, depth, state=None):
+        '''
+        :tp: the TPSwitchStatement of the pairs at the leaf
+        :state: the leaf's NodeState, if the model is updatable
+
+        :return: a leaf without a productive process
+        '''
+        tp.build_neighbor_index() # inflections at unproductive leaves are guessed
+        node = ATP.Node(f'{path_string} => No Productive Process', tp, depth=depth)
+        node.state = state
+        return node
+
+    def split_node(self, store, indices, split_feature, mask, split_options, path_string, ending_statistics, depth, parallel=None, state=None, record=NULL_NODE_PROFILE):
+        '''
+        Build an internal node that splits its pairs on :split_feature:, and recursively build its children.
+
+        :mask: a boolean array, aligned with :indices:, of the pairs that :split_feature: applies to
+        :split_options: the node's split options, of which the children are built with all but :split_feature:
+        :state: the node's NodeState, if the model is updatable
+        :record: the node's NodeProfile, if training is being profiled
+
+        :return: the internal node
+        '''
+        pos_indices, neg_indices = indices[mask], indices[~mask]
         # create a new node
-        node = ATP.Node(f'{path_string}', None)
-        assert(len(splits.keys()) == 2)
+        node = ATP.Node(f'{path_string}', None, depth=depth)
+        node.state = state
 
         split_feature_name = f'{split_feature}'
         neg_split_feature_name = f'{NEG_SYMBOL}{split_feature}'
 
         path = f'{path_string},' if path_string != '' else ''
 
+        # derive the children's ending statistics from this node's rather than recounting both
+        pos_statistics, neg_statistics = ending_statistics.split(store.pairs_of(pos_indices), store.pairs_of(neg_indices))
+        record.lap('ending_statistics')
+        record.finish()
+
         # recursively search over the pairs that have the split feature
-        node.add_child(left=True, branch_condition=(True, split_feature), child_node=self.build_node(_pairs=splits[split_feature_name], 
-                                                                                                     _labels=splits_labels[split_feature_name], 
-                                                                                                     split_options=split_options.difference({split_feature}),
-                                                                                                     path_string=f'{path}{split_feature_name}'))
+        self.build_child(node, left=True, split_feature=split_feature, parallel=parallel,
+                         store=store,
+                         indices=pos_indices,
+                         split_options=split_options.difference({split_feature}),
+                         path_string=f'{path}{split_feature_name}',
+                         ending_statistics=pos_statistics,
+                         depth=depth + 1)
         # recursively search over the pairs that do NOT have the split feature
-        node.add_child(left=False, branch_condition=(False, split_feature), child_node=self.build_node(_pairs=splits[neg_split_feature_name], 
-                                                                                                       _labels=splits_labels[neg_split_feature_name], 
-                                                                                                       split_options=split_options.difference({split_feature}),
-                                                                                                       path_string=f'{path}{neg_split_feature_name}'))
+        self.build_child(node, left=False, split_feature=split_feature, parallel=parallel,
+                         store=store,
+                         indices=neg_indices,
+                         split_options=split_options.difference({split_feature}),
+                         path_string=f'{path}{neg_split_feature_name}',
+                         ending_statistics=neg_statistics,
+                         depth=depth + 1)
         return node
 
+    def build_child(self, node, left, split_feature, parallel, store, **kwargs):
+        '''
+        Add a child to :node:, built by build_node with :kwargs:.
+        If training in parallel and the child is deep enough, its subtree is instead handed off to a worker process and added once it is done.
+        '''
+        branch_condition = (left, split_feature)
+        if parallel is not None and kwargs['depth'] >= parallel.depth:
+            parallel.submit(node, left, branch_condition, **kwargs)
+        else:
+            node.add_child(left=left, branch_condition=branch_condition, child_node=self.build_node(store=store, parallel=parallel, **kwargs))
+
     def get_useless_splits(self, options, _pairs, _labels):
         '''
         :return: any split options that are totally uninformative (i.e., all :_pairs: go down the same branch).
         '''
+        store = PairStore(_pairs, Vocab().ids(_labels))
+        return self.useless_splits(store, store.all_indices(), options)
+
+    def useless_splits(self, store, indices, options, state=None):
+        '''
+        :state: if not None, the NodeState of the node with the pairs at :indices:, whose counts are used rather than recounting the pairs
+
+        :return: any split options that are totally uninformative (i.e., all the pairs at :indices: go down the same branch).
+        '''
+        options = list(options)
         useless = set()
-        for sf in options:
-            _, _, splits_labels = self.split(_pairs, _labels, sf)
-            subset_labels = splits_labels[sf.name]
-            if len(subset_labels) == 0 or len(subset_labels) == len(_labels):
+        counts = state.count_applies(options) if state is not None else store.count_applies(options, indices)
+        for sf, num_applies in zip(options, counts):
+            if num_applies == 0 or num_applies == len(indices):
                 useless.add(sf)
         return useless
 
-    def phonological_features(self, _pairs, _labels):
+    def phonological_features(self, _pairs, _labels, ending_statistics=None):
         '''
         Add phonological features (lemma endings).
 
         :_pairs: the training pairs that made it to this node
         :_labels: the training suffixes corresponding to the pairs
+        :ending_statistics: the EndingStatistics of :_pairs:, if they have already been computed
 
         :return: a set of phonological conditions
         '''
+        if ending_statistics is None:
+            ending_statistics = EndingStatistics(_pairs)
+        ending_counts = ending_statistics.ending_counts
+        ending_suffix_counts = ending_statistics.ending_suffix_counts
         phonological_conditions = set()
-        suffix_to_pairs = defaultdict(set)
-        ending_to_pairs = defaultdict(set)
-        for pair in _pairs:
-            lemma, inflected, _ = pair
-            if inflected.startswith(lemma):
-                suffix = inflected[len(lemma):]
-                suffix_to_pairs[suffix].add(pair)
-            for ending_length in range(1, 6):
-                if len(lemma) > ending_length:
-                    ending_to_pairs[lemma[-ending_length:]].add(pair)
-        
-        skip = set()
+
+        skip = SuffixTrie()
         passed_endings = list()
-        for suffix, pairs_with_suffix in sorted(suffix_to_pairs.items(), reverse=True, key=lambda it: len(it[1])):
+        passing_endings = ending_statistics.passing_endings() # the endings (shortest first) over which each suffix passes the TP
+        for suffix in ending_statistics.suffixes():
             suffix_passed_endings = list()
             c_total = 0 # counts the pairs at this node that are covered by these ending -> suffix rules
             n_total = 0
-            local_skip = set()
-            for ending in sorted(list(ending_to_pairs.keys()), key=lambda it: (len(it), it)):
-                if any(ending.endswith(e) for e in skip.union(local_skip)):
+            local_skip = SuffixTrie()
+            for ending in passing_endings.get(suffix, ()):
+                if skip.matches(ending) or local_skip.matches(ending): # skip endings that are covered by an already-passed ending
                     continue
-                n = len(ending_to_pairs[ending]) # words with ending
-                c = len(pairs_with_suffix.intersection(ending_to_pairs[ending])) # words with ending and suffix
-                if tolerance_principle(n=n, c=c):
-                    suffix_passed_endings.append(ending)
-                    local_skip.add(ending)
-                    n_total += n
-                    c_total += c
+                suffix_passed_endings.append(ending)
+                local_skip.add(ending)
+                n_total += ending_counts[ending] # words with ending
+                c_total += ending_suffix_counts[(ending, suffix)] # words with ending and suffix
             if len(suffix_passed_endings) > 0:
                 n = n_total # words with any of the endings
                 c = c_total # words with any of the endings and the suffix
-                if tolerance_principle(n=n, c=c) and tolerance_principle(n=len(pairs_with_suffix), c=c):
+                if tolerance_principle(n=n, c=c) and tolerance_principle(n=ending_statistics.suffix_counts[suffix], c=c):
                     skip.update(suffix_passed_endings)
                     if len(suffix_passed_endings) > 1:
                         suffix_passed_endings = tuple(e for e in suffix_passed_endings)
@@ -326,37 +769,39 @@ class ATP:
 
     def consistency(self, _labels):
         '''
-        :return: the relative frequency of the most frequent suffix in :_labels:
+        :_labels: an int array of labels (as from build_labels)
+
+        :return: the relative frequency of the most frequent label in :_labels:
         '''
-        most_frequent_label = most_freq(_labels)
         n = len(_labels)
-        c = _labels.count(most_frequent_label) # the frequency of the most frequent suffix
-        if c == n == 0:
+        if n == 0:
             return 0
+        c = int(np.bincount(_labels).max()) # the frequency of the most frequent label
         return c / n
 
     def maximize_productivity(self, _pairs, _labels, split_options):
         '''
         Perform the split that Maximizes Productivit via consistency, i.e., "the relative frequency of the most frequent suffix that the instances with that feature take."
         '''
-        arg_max = None
-        max_val = -100000
-        for split_feature in split_options:
-            _, splits_vals, splits_labels = self.split(_pairs, _labels, split_feature)
-            subset_labels = splits_labels[f'{split_feature}']
-            consistency = self.consistency(subset_labels)
-            if consistency > max_val:
-                max_val = consistency
-                arg_max = split_feature
-            neg_split_feature = f'{NEG_SYMBOL}{split_feature}'
-            subset_labels = splits_labels[neg_split_feature]
-            consistency = self.consistency(subset_labels)
-            if consistency > max_val:
-                max_val = consistency
-                arg_max = split_feature
-        split_feature = arg_max
+        store = PairStore(_pairs, Vocab().ids(_labels))
+        split_feature, _ = self.best_split(store, store.all_indices(), split_options)
         return self.split(_pairs, _labels, split_feature)
 
+    def best_split(self, store, indices, split_options, state=None):
+        '''
+        Find the split that Maximizes Productivity via consistency over the pairs at :indices:.
+        Ties are broken deterministically, in favor of the option that comes first in the canonical (sorted) order of conditions.
+
+        :state: if not None, the NodeState of a node, whose pairs the split is found over instead (from its counts); :indices: are then only masked
+
+        :return: the split feature and a boolean mask, aligned with :indices:, of the pairs it applies to
+        '''
+        split_options = sorted(split_options) # conditions sort by (type, name)
+        consistencies = state.split_consistencies(split_options) if state is not None else store.split_consistencies(split_options, indices)
+        # np.argmax returns the first maximum, visiting each option's feature and then its negation
+        split_feature = split_options[int(np.argmax(consistencies)) // 2]
+        return split_feature, store.mask(split_feature, indices)
+
     def split(self, _pairs, _labels, split_feature):
         '''
         :_pairs: the pairs to split
@@ -364,24 +809,15 @@ class ATP:
 
         :return: the :split_feature: a dict mapping the feature/neg-feature to the set of pairs with/without the feature, and a dict doing the same for the labels
         '''
-        X = list() # X_s
-        X_labels = list()
-        Y = list() # X \ X_s
-        Y_labels = list()
-        for i, pair in enumerate(_pairs):
-            lemma, _, feats = pair
-            if split_feature.applies(lemma, feats):
-                X.append(pair)
-                X_labels.append(_labels[i])
-            else:
-                Y.append(pair)
-                Y_labels.append(_labels[i])
+        store = PairStore(_pairs, Vocab().ids(_labels))
+        indices = store.all_indices()
+        mask = store.mask(split_feature, indices)
         X_name = f'{split_feature}'
         Y_name = f'{NEG_SYMBOL}{split_feature}'
         # a map from left/right subset names to the left/right subsets
-        splits = {X_name: X, Y_name: Y}
+        splits = {X_name: store.pairs_of(indices[mask]), Y_name: store.pairs_of(indices[~mask])}
         # a map from left/right subset names to the left/right subset labels
-        splits_labels = {X_name: X_labels, Y_name: Y_labels}
+        splits_labels = {X_name: [_labels[i] for i in indices[mask]], Y_name: [_labels[i] for i in indices[~mask]]}
         return split_feature, splits, splits_labels
 
     def plot_tree(self, save_path, open_pdf=False):
@@ -447,15 +883,30 @@ def main(args):
     A function for running from the command line.
     '''
     ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
-    pairs, feature_space = load_pairs(args.input, sep=args.sep, feat_sep=args.feat_sep)
-    atp = ATP(feature_space=feature_space)
-    atp.train(pairs) # train ATP
+    if args.input:
+        pairs, feature_space = load_pairs(args.input, sep=args.sep, feat_sep=args.feat_sep)
+        atp = ATP(feature_space=feature_space)
+        profile = TrainingProfile() if args.profile else None
+        atp.train(pairs, profile=profile) # train ATP
+        if profile is not None:
+            profile.save(args.profile)
+            print(profile.summary(), file=sys.stderr)
+        if args.model:
+            atp.save(args.model)
+    else:
+        atp = ATP.load(args.model)
 
     if args.test_path: # test ATP if a test path was provided
-        pairs, _ = load_pairs(args.test_path, sep=args.sep, feat_sep=args.feat_sep, skip_header=args.skip_header)
-        with open(args.out_path, 'w') if args.out_path else sys.stdout as f:
-            for lemma, _, feats in pairs:
-                f.write(f'{atp.inflect(lemma, feats)}\n')
+        # the test pairs are streamed, so the test file can be arbitrarily large
+        pairs = iter_pairs(args.test_path, sep=args.sep, feat_sep=args.feat_sep, skip_header=args.skip_header)
+        start, n = time.time(), 0
+        with open(args.out_path, 'w', buffering=1 << 20) if args.out_path else sys.stdout as f:
+            for preds in atp.inflect_stream(pairs, batch_size=args.batch_size, n_jobs=args.workers):
+                f.write(''.join(f'{pred}\n' for pred in preds))
+                n += len(preds)
+        elapsed = time.time() - start
+        # report to stderr, so that the predictions can be piped from stdout
+        print(f'Inflected {n} pairs in {elapsed:.2f}s ({n / max(elapsed, 1e-9):.0f} pairs/s) with {args.workers} worker(s)', file=sys.stderr)
 
 def parse_args():
     def str2bool(v):
@@ -467,13 +918,20 @@ def parse_args():
             raise argparse.ArgumentTypeError('Boolean value expected.')
 
     parser = argparse.ArgumentParser()
-    parser.add_argument('--input', '-i', type=str, required=True, help="A path to a dataset of training pairs.")
-    parser.add_argument('--test_path', '-t', type=str, required=False, default=None, help="A path to a dataset of test pairs.")
+    parser.add_argument('--input', '-i', type=str, required=False, default=None, help="A path to a dataset of training pairs.")
+    parser.add_argument('--model', '-m', type=str, required=False, default=None, help="A path to a saved model. If --input is given, the trained model is saved here; otherwise, the model is loaded from here instead of training.")
+    parser.add_argument('--test_path', '-t', type=str, required=False, default=None, help="A path to a dataset of test pairs, or - to read them from stdin.")
     parser.add_argument('--out_path', '-o', type=str, required=False, default=None, help="A path to write the test results to. If None, it will print to stdout.")
     parser.add_argument('--sep', '-s', type=str, required=False, default='\t', help="The column seperator for the input file.")
     parser.add_argument('--feat_sep', '-fs', type=str, required=False, default=';', help="The seperator for features in the input file.")
     parser.add_argument('--skip_header', '-sh', type=str2bool, required=False, default=False, help="If True, skips the first line of the input file, treating it as a header.")
-    return parser.parse_args()
+    parser.add_argument('--workers', '-w', type=int, required=False, default=1, help="The number of processes to inflect the test pairs with.")
+    parser.add_argument('--profile', '-p', type=str, required=False, default=None, help="If given, a path to save a JSON profile of training to (see training_profile.py). A summary is printed to stderr.")
+    parser.add_argument('--batch_size', '-b', type=int, required=False, default=10000, help="The number of test pairs to read and inflect at a time.")
+    args = parser.parse_args()
+    if not args.input and not args.model:
+        parser.error('one of --input or --model is required')
+    return args
 
 if __name__ == "__main__":
     args = parse_args()
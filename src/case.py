@@ -1,29 +1,65 @@
+# the kinds of case
+SUFFIX = 'suffix' # inflects a lemma by adding a suffix
+MEMORIZED = 'memorized' # produces a memorized inflection
+IDENTITY = 'identity' # returns the lemma unchanged
+
 class Case:
     '''
     A case for a switch statement.
+
+    A case is plain data: its kind and a payload (the suffix of a SUFFIX case, or the (lemma, inflection) pair of a MEMORIZED case),
+    which makes cases cheap to build and lets switch statements be pickled and shared across processes.
     '''
+    __slots__ = ('kind', 'payload', 'name', 'label', 'lemmas', 'phon_engine')
 
-    def __init__(self, condition, inflect, name, default=False):
+    def __init__(self, kind, payload=None, phon_engine=None):
         '''
-        :condition: a boolean lambda function that takes a (lemma, inflection) pair as parameters
-        :inflect: a lambda function that takes a lemma as a parameter and returns the inflected form
-        :name: a name that describes the case
-        :default: True iff the case is the default case of a switch statement
+        :kind: SUFFIX, MEMORIZED, or IDENTITY
+        :payload: the suffix of a SUFFIX case, or the (lemma, inflection) pair of a MEMORIZED case
+        :phon_engine: if not None, the PhonEngine used to apply a SUFFIX case's suffix
         '''
         # the set of lemmas that have been encountered during training that can be inflected by this case
         self.lemmas = set()
-        self.condition = condition
-        self.inflect = inflect
-        self.name = name
-        self.default = default
+        self.kind = kind
+        self.payload = payload
+        self.phon_engine = phon_engine
+        if kind == SUFFIX:
+            self.name = f'inflected = lemma + {payload}'
+        elif kind == MEMORIZED:
+            self.name = f'inflected = {payload[1]}'
+        else:
+            self.name = 'default-default'
+        self.label = None # the int id of the case's name in the switch statement that the case is added to (see TPSwitchStatement.add_case)
 
     def __str__(self):
         return self.name
 
+    def inflect(self, lemma):
+        '''
+        :return: the inflected form of :lemma: produced by this case
+        '''
+        if self.kind == SUFFIX:
+            if self.phon_engine is None:
+                return f'{lemma}{self.payload}'
+            return self.phon_engine.apply_suffix(lemma, self.payload)
+        if self.kind == MEMORIZED:
+            return self.payload[1]
+        return lemma
+
+    def condition(self, lemma, inflection):
+        '''
+        :return: True iff this case explains the (:lemma:, :inflection:) pair
+        '''
+        if self.kind == SUFFIX:
+            return inflection == self.inflect(lemma)
+        if self.kind == MEMORIZED:
+            return (lemma, inflection) == self.payload
+        return True
+
     def apply(self, lemma, inflection, feats, train=False):
         if self.condition(lemma, inflection):
             if train:
                 self.lemmas.add((lemma, feats)) # the lemma is a hit
             return self.inflect(lemma)
         else:
-            return False # return False if the case does not apply
\ No newline at end of file
+            return False # return False if the case does not apply
@@ -0,0 +1,147 @@
+from array import array
+
+# condition kinds stored in the kind column
+LEAF = 0
+SEMANTIC = 1
+PHONOLOGICAL = 2
+
+class CompiledATP:
+    '''
+    A flat, array-backed compilation of a trained ATP decision tree, used for fast inference.
+
+    Each node of the tree is assigned an integer id (the root is 0). Internal nodes store the kind of their
+    branch condition, the condition's payload (a feature for semantic conditions and an ending or tuple of endings for phonological ones),
+    and the ids of the children reached when the condition does and does not apply. Leaves point at a row of precomputed switch statement tables.
+    '''
+    def __init__(self, root):
+        '''
+        :root: the root ATP.Node of a trained ATP model. If None, the columns and tables are left empty to be filled in (e.g., by model_io.load_compiled).
+        '''
+        # node columns
+        self.kinds = array('b')
+        self.conditions = list()
+        self.pos_child = array('i')
+        self.neg_child = array('i')
+        self.leaf_ids = array('i')
+        # leaf tables
+        self.leaf_names = list()
+        self.leaf_productive = list()
+        self.leaf_memorized = list() # maps (lemma, feats) -> the memorized inflection
+        self.leaf_default = list() # the inflect function of the leaf's default case
+        self.leaf_guess = list() # the guess function of the leaf's switch statement
+
+        if root is not None:
+            self.compile(root)
+
+    def add_node(self):
+        '''
+        :return: the id of a new, empty node.
+        '''
+        self.kinds.append(LEAF)
+        self.conditions.append(None)
+        self.pos_child.append(-1)
+        self.neg_child.append(-1)
+        self.leaf_ids.append(-1)
+        return len(self.kinds) - 1
+
+    def add_leaf(self, node_id, node):
+        '''
+        Precompute the switch statement tables for a leaf.
+        '''
+        self.leaf_ids[node_id] = len(self.leaf_names)
+        self.add_leaf_table(node.name, node.switch_statement)
+
+    def add_leaf_table(self, name, switch_statement):
+        '''
+        Add a row to the leaf tables for a leaf with the given :name: and :switch_statement:.
+        '''
+        memorized = dict()
+        for case in switch_statement.cases:
+            for lemma, feats in case.lemmas:
+                if (lemma, feats) not in memorized: # the first case containing the lemma wins, as in TPSwitchStatement.inflect
+                    memorized[(lemma, feats)] = case.inflect(lemma)
+        self.leaf_names.append(name)
+        self.leaf_productive.append(switch_statement.productive)
+        self.leaf_memorized.append(memorized)
+        self.leaf_default.append(switch_statement.default_case.inflect)
+        self.leaf_guess.append(switch_statement.guess)
+
+    def compile(self, root):
+        '''
+        Flatten the tree rooted at :root: into the node columns and leaf tables.
+        '''
+        frontier = [(root, self.add_node())]
+        while len(frontier) != 0:
+            node, node_id = frontier.pop()
+            if node.num_children() == 0:
+                self.add_leaf(node_id, node)
+                continue
+            for (pos, condition), child in node.get_children():
+                if condition.condition_type == 'Semantic':
+                    self.kinds[node_id] = SEMANTIC
+                    self.conditions[node_id] = condition.feature
+                else:
+                    self.kinds[node_id] = PHONOLOGICAL
+                    self.conditions[node_id] = condition.ending # str.endswith accepts a single ending or a tuple of endings
+                child_id = self.add_node()
+                if pos:
+                    self.pos_child[node_id] = child_id
+                else:
+                    self.neg_child[node_id] = child_id
+                frontier.append((child, child_id))
+
+    def num_nodes(self):
+        '''
+        :return: the number of nodes in the compiled tree.
+        '''
+        return len(self.kinds)
+
+    def probe_leaf(self, lemma, features):
+        '''
+        :return: the leaf row reached by (:lemma:, :features:).
+        '''
+        kinds, conditions, pos_child, neg_child = self.kinds, self.conditions, self.pos_child, self.neg_child
+        i = 0
+        kind = kinds[0]
+        while kind != LEAF:
+            if kind == SEMANTIC:
+                applies = conditions[i] in features
+            else:
+                applies = lemma.endswith(conditions[i])
+            i = pos_child[i] if applies else neg_child[i]
+            kind = kinds[i]
+        return self.leaf_ids[i]
+
+    def guess_inflection(self, lemma, leaf):
+        '''
+        :return: an inflected form using the nearest-neighbor in the :leaf:'s vocab (using Hamming distance).
+        '''
+        return self.leaf_guess[leaf](lemma)
+
+    def inflect_known(self, lemma, features, leaf):
+        '''
+        :return: the inflection of (:lemma:, :features:) at :leaf: if it was memorized or the leaf is productive, or None if it would have to be guessed
+        '''
+        pred = self.leaf_memorized[leaf].get((lemma, features))
+        if pred is None and self.leaf_productive[leaf]:
+            pred = self.leaf_default[leaf](lemma)
+        return pred
+
+    def inflect(self, lemma, features, return_whether_guess=False):
+        '''
+        Inflect a lemma. Produces the same output as ATP.inflect on the tree that was compiled.
+
+        :lemma: the lemma to inflect
+        :features: the features specifying which inflection to produce
+        :return_whether_guess: if True, it will also return a boolean specifying whether guessing was required
+        '''
+        leaf = self.probe_leaf(lemma, features)
+        pred = self.inflect_known(lemma, features, leaf)
+        if pred is not None:
+            if return_whether_guess:
+                return pred, False
+            return pred
+        guess = self.guess_inflection(lemma, leaf)
+        if return_whether_guess:
+            return guess, True
+        return guess
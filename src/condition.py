@@ -1,9 +1,55 @@
+import weakref
+
 class Condition:
     '''
     A super class to represent a branch condition in a decision tree.
+
+    Conditions are interned: constructing a condition that already exists returns the existing object.
+    They are also compared, hashed, and ordered by value (their type and name), which gives split options a canonical order
+    and lets the results of evaluating a condition be cached across the nodes of a tree.
     '''
+    _interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, value):
+        key = (cls, value)
+        condition = Condition._interned.get(key)
+        if condition is None:
+            condition = super().__new__(cls)
+            Condition._interned[key] = condition
+        return condition
+
     def __init__(self, condition_type):
         self.condition_type = condition_type
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    def sort_key(self):
+        return (self.condition_type, self.name)
+
+    def __eq__(self, other):
+        return self is other or (isinstance(other, Condition) and self.sort_key() == other.sort_key())
+
+    def __hash__(self):
+        return hash(self.sort_key())
+
+    def __lt__(self, other):
+        return self.sort_key() < other.sort_key()
+
+    def partition(self, lemmas, features, indices):
+        '''
+        Split a batch in a single pass.
+
+        :lemmas: a list of lemmas
+        :features: a list of feature tuples, aligned with :lemmas:
+        :indices: the indices into :lemmas: and :features: to split
+
+        :return: a tuple (applies, does_not_apply) of index lists
+        '''
+        applies, does_not_apply = list(), list()
+        for i in indices:
+            if self.applies(lemmas[i], features[i]):
+                applies.append(i)
+            else:
+                does_not_apply.append(i)
+        return applies, does_not_apply
@@ -0,0 +1,126 @@
+from collections import Counter, defaultdict
+
+from utils import tolerance_principle
+
+MAX_ENDING_LENGTH = 5
+
+class EndingStatistics:
+    '''
+    Counts of lemma endings and suffixes over the (distinct) training pairs at a node of an ATP decision tree.
+    These are the quantities that ATP.phonological_features needs to propose phonological conditions:
+        - ending_counts[ending]: the number of pairs whose lemma has the ending
+        - ending_suffix_counts[(ending, suffix)]: the number of those pairs that take the suffix
+        - suffix_counts[suffix]: the number of pairs that take the suffix
+    The statistics of a node's two children can be derived by scanning only the smaller child and subtracting from the parent.
+    '''
+    def __init__(self, pairs=None):
+        '''
+        :pairs: if provided, the statistics are counted over these pairs.
+        '''
+        self.ending_counts = Counter()
+        self.ending_suffix_counts = Counter()
+        self.suffix_counts = Counter()
+        self.suffix_order = list() # suffixes in order of first occurrence, which breaks ties between equally frequent suffixes
+        self.passing = None # maps each ending to the suffix that passes the tolerance principle over it, once it is needed (see passing_endings)
+        if pairs is not None:
+            self.count(pairs)
+
+    def count(self, pairs, known=()):
+        '''
+        Count the statistics in a single pass over :pairs:, adding to the counts so far.
+
+        :known: the distinct pairs that have already been counted, which are skipped (e.g., when adding new pairs to a node's statistics)
+        '''
+        pairs = dict.fromkeys(pairs) # only count distinct pairs
+        if len(known) > 0:
+            pairs = [pair for pair in pairs if pair not in known]
+        suffix_order = dict.fromkeys(self.suffix_order)
+        for lemma, inflected, _ in pairs:
+            suffix = inflected[len(lemma):] if inflected.startswith(lemma) else None
+            if suffix is not None:
+                self.suffix_counts[suffix] += 1
+                suffix_order.setdefault(suffix)
+            for ending_length in range(1, MAX_ENDING_LENGTH + 1):
+                if len(lemma) > ending_length:
+                    ending = lemma[-ending_length:]
+                    self.ending_counts[ending] += 1
+                    if suffix is not None:
+                        self.ending_suffix_counts[(ending, suffix)] += 1
+        self.suffix_order = list(suffix_order)
+        if self.passing is not None:
+            self.update_passing(pairs)
+
+    def passing_endings(self):
+        '''
+        :return: a dict mapping each suffix to the endings, from shortest to longest, over which the suffix passes the tolerance principle on its own.
+            These are the only endings that ATP.phonological_features can propose for the suffix.
+        '''
+        if self.passing is None:
+            # a suffix must cover more than half of the pairs with an ending to pass over it, so each ending has at most one passing suffix
+            self.passing = dict()
+            for (ending, suffix), c in self.ending_suffix_counts.items():
+                if c > 2 and tolerance_principle(n=self.ending_counts[ending], c=c):
+                    self.passing[ending] = suffix
+        endings = defaultdict(list)
+        for ending in sorted(self.passing, key=lambda it: (len(it), it)):
+            endings[self.passing[ending]].append(ending)
+        return endings
+
+    def update_passing(self, pairs):
+        '''
+        Update the passing suffix of each ending of :pairs:, which have just been counted.
+        Adding pairs only makes it harder for a suffix to pass over an ending unless the suffix's count grew,
+        so the only candidates are an ending's passing suffix so far and the suffixes of :pairs:.
+        '''
+        candidates = set()
+        for lemma, inflected, _ in pairs:
+            suffix = inflected[len(lemma):] if inflected.startswith(lemma) else None
+            for ending_length in range(1, min(len(lemma) - 1, MAX_ENDING_LENGTH) + 1):
+                ending = lemma[-ending_length:]
+                if ending in self.passing:
+                    candidates.add((ending, self.passing.pop(ending)))
+                if suffix is not None:
+                    candidates.add((ending, suffix))
+        for ending, suffix in candidates:
+            c = self.ending_suffix_counts[(ending, suffix)]
+            if c > 2 and tolerance_principle(n=self.ending_counts[ending], c=c):
+                self.passing[ending] = suffix
+
+    def subtract(self, other, pairs):
+        '''
+        :other: the statistics of a subset of the pairs these statistics were counted over
+        :pairs: the remaining pairs (used only to recover the order in which suffixes first occur)
+
+        :return: the statistics of the remaining pairs
+        '''
+        res = EndingStatistics()
+        res.ending_counts = self.ending_counts - other.ending_counts # Counter subtraction drops non-positive counts
+        res.ending_suffix_counts = self.ending_suffix_counts - other.ending_suffix_counts
+        res.suffix_counts = self.suffix_counts - other.suffix_counts
+        res.suffix_order = list(dict.fromkeys(inflected[len(lemma):] for lemma, inflected, _ in pairs if inflected.startswith(lemma)))
+        return res
+
+    def split(self, X, Y):
+        '''
+        :X: one subset of the pairs these statistics were counted over
+        :Y: the complement of :X:
+
+        :return: the statistics of :X: and of :Y:, counting only the smaller of the two
+        '''
+        if len(X) <= len(Y):
+            X_stats = EndingStatistics(X)
+            return X_stats, self.subtract(X_stats, Y)
+        Y_stats = EndingStatistics(Y)
+        return self.subtract(Y_stats, X), Y_stats
+
+    def suffixes(self):
+        '''
+        :return: the suffixes, from most to least frequent
+        '''
+        return sorted(self.suffix_order, reverse=True, key=lambda suffix: self.suffix_counts[suffix])
+
+    def endings(self):
+        '''
+        :return: the lemma endings, from shortest to longest
+        '''
+        return sorted(self.ending_counts.keys(), key=lambda it: (len(it), it))
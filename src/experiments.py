@@ -0,0 +1,191 @@
+import os
+import csv
+import json
+import time
+import argparse
+from functools import lru_cache
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from atp import ATP
+from case import SUFFIX
+from utils import load_pairs, load_word_to_ipa
+from parallel_build import mp_context
+
+# A runner for grids of experiments, like those in notebooks/Experiments.ipynb.
+# A grid spec is a dict (or a JSON file) such as
+#     {"train": "../data/german/quant/train{size}_{seed}.txt",
+#      "test": "../data/german/quant/test_{seed}.txt",
+#      "size": [60, 120, 180, 240, 300, 360],
+#      "seed": "0:25"}
+# Every key other than the OPTIONS is an axis of the grid, whose values are a list or a "start:stop[:step]" range,
+# and each combination of values is one job: train ATP on the "train" path (formatted with the job's values) and evaluate it on the "test" path, if there is one.
+# Each job's results are appended to a CSV file as soon as the job is done, so an interrupted run picks up where it left off.
+
+# the keys of a grid spec that are not axes of the grid
+OPTIONS = {'train': None, # the path template of the training pairs (required)
+           'test': None, # the path template of the test pairs
+           'sep': '\t', # the column separator of the data files
+           'feat_sep': ';', # the separator of features in the data files
+           'ipa': False, # if True, convert words to IPA (see utils.load_word_to_ipa), as for the English data
+           'apply_phonology': False} # passed to ATP
+# the columns of the results table, after one column per axis
+COLUMNS = ('num_pairs', 'num_leaves', 'num_productive_leaves', 'productive_suffixes', 'test_accuracy', 'test_accuracy_no_feats', 'train_seconds')
+
+def axis_values(values):
+    '''
+    :return: the list of values of an axis given as a list or as a "start:stop[:step]" range
+    '''
+    if type(values) is str:
+        return list(range(*(int(bound) for bound in values.split(':'))))
+    return list(values)
+
+def expand_grid(spec):
+    '''
+    :return: a tuple (axes, jobs), where axes is a list of the names of the grid's axes and jobs is a list of dicts mapping each axis to one of its values
+    '''
+    assert('train' in spec)
+    axes = [key for key in spec if key not in OPTIONS]
+    jobs = [dict(zip(axes, values)) for values in product(*(axis_values(spec[axis]) for axis in axes))]
+    return axes, jobs
+
+@lru_cache(maxsize=None)
+def word_to_ipa():
+    return load_word_to_ipa()
+
+@lru_cache(maxsize=64)
+def load_dataset(path, sep, feat_sep, ipa):
+    '''
+    Load a dataset, caching it so that each worker process loads a file (e.g., a test set shared by many jobs) only once.
+
+    :return: a tuple (pairs, feature_space), as from utils.load_pairs
+    '''
+    if ipa:
+        ipa_of = word_to_ipa()
+        return load_pairs(path, sep=sep, feat_sep=feat_sep, preprocessing=lambda s: ipa_of[s])
+    return load_pairs(path, sep=sep, feat_sep=feat_sep)
+
+def productive_suffixes(atp):
+    '''
+    :return: the sorted suffixes of the productive leaves of :atp:, written as in ATP.plot_tree (e.g., '-en', or '-∅' for the empty suffix)
+    '''
+    suffixes = set()
+    for leaf in atp.get_leaves():
+        case = leaf.switch_statement.default_case
+        if leaf.switch_statement.productive and case.kind == SUFFIX:
+            suffixes.add(f'-{case.payload}' if case.payload != '' else '-∅')
+    return sorted(suffixes)
+
+def run_job(spec, params):
+    '''
+    Train and evaluate ATP for one job of a grid.
+
+    :spec: the grid spec
+    :params: the job's value of each axis
+
+    :return: the job's row of the results table
+    '''
+    options = {key: spec.get(key, default) for key, default in OPTIONS.items()}
+    pairs, feature_space = load_dataset(options['train'].format(**params), options['sep'], options['feat_sep'], options['ipa'])
+    start = time.time()
+    atp = ATP(feature_space=feature_space, apply_phonology=options['apply_phonology']).train(pairs)
+    train_seconds = time.time() - start
+    leaves = atp.get_leaves()
+    row = dict(params)
+    row.update({'num_pairs': len(pairs),
+                'num_leaves': len(leaves),
+                'num_productive_leaves': sum(leaf.switch_statement.productive for leaf in leaves),
+                'productive_suffixes': ' '.join(productive_suffixes(atp)),
+                'test_accuracy': '',
+                'test_accuracy_no_feats': '',
+                'train_seconds': round(train_seconds, 4)})
+    if options['test'] is not None:
+        test_pairs, _ = load_dataset(options['test'].format(**params), options['sep'], options['feat_sep'], options['ipa'])
+        row['test_accuracy'] = atp.accuracy(test_pairs)
+        row['test_accuracy_no_feats'] = atp.accuracy(test_pairs, no_feats=True)
+    return row
+
+def drop_partial_row(path):
+    '''
+    Truncate the file at :path: after its last line break, dropping a row that an interruption cut short.
+    '''
+    with open(path, 'rb+') as f:
+        data = f.read()
+        f.truncate(data.rfind(b'\n') + 1)
+
+def completed_jobs(path, columns):
+    '''
+    :return: the set of jobs (as tuples of their axis values, as strings) with a row in the results table at :path:,
+        which must not end in a row cut short by an interruption (see drop_partial_row)
+    '''
+    completed = set()
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return completed
+    with open(path, 'r', newline='') as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames != list(columns):
+            raise ValueError(f'{path} has columns {reader.fieldnames}, but the grid has columns {list(columns)}')
+        axes = columns[:len(columns) - len(COLUMNS)]
+        for row in reader:
+            completed.add(tuple(row[axis] for axis in axes))
+    return completed
+
+def run_grid(spec, path, n_jobs=1):
+    '''
+    Run every job of a grid that does not yet have a row in the results table at :path:, appending each job's row as soon as it is done.
+    The rows are in the order that the jobs finish in.
+
+    :spec: the grid spec
+    :path: the path of the results table (a CSV file)
+    :n_jobs: the number of processes to run jobs in. Each worker process caches the datasets it loads.
+
+    :return: the number of jobs that were run
+    '''
+    axes, jobs = expand_grid(spec)
+    columns = axes + list(COLUMNS)
+    if os.path.exists(path):
+        # a row without its line break may have lost only its last few characters, so it is rerun rather than counted as done
+        drop_partial_row(path)
+    completed = completed_jobs(path, columns)
+    pending = [params for params in jobs if tuple(str(params[axis]) for axis in axes) not in completed]
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        if new_file:
+            writer.writeheader()
+        def write(row):
+            writer.writerow(row)
+            f.flush()
+        if n_jobs > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs, mp_context=mp_context()) as executor:
+                for future in as_completed([executor.submit(run_job, spec, params) for params in pending]):
+                    write(future.result())
+        else:
+            for params in pending:
+                write(run_job(spec, params))
+    return len(pending)
+
+def main(args):
+    '''
+    A function for running from the command line.
+    '''
+    with open(args.spec, 'r') as f:
+        spec = json.load(f)
+    start = time.time()
+    n = run_grid(spec, args.output, n_jobs=args.workers)
+    print(f'Ran {n} job(s) in {time.time() - start:.2f}s with {args.workers} worker(s)')
+    if args.parquet:
+        import pandas as pd
+        pd.read_csv(args.output).to_parquet(args.parquet) # requires pyarrow or fastparquet
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--spec', '-g', type=str, required=True, help="A path to a JSON grid spec.")
+    parser.add_argument('--output', '-o', type=str, required=True, help="A path to the CSV results table. If it already exists, only the jobs without a row in it are run.")
+    parser.add_argument('--workers', '-w', type=int, required=False, default=1, help="The number of processes to run jobs in.")
+    parser.add_argument('--parquet', '-p', type=str, required=False, default=None, help="If given, a path to also write the finished results table to as Parquet.")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(args)
@@ -0,0 +1,140 @@
+import bisect
+from collections import Counter
+from threading import Lock
+
+# the outcomes of inflecting a lemma at a leaf
+MEMORIZED = 'memorized' # the (lemma, features) was seen in training
+PRODUCTIVE = 'productive' # the leaf's productive process applied
+GUESSED = 'guessed' # the inflection was guessed from the leaf's nearest neighbor
+
+# the upper bounds of the latency histogram's buckets (in seconds): 10 per decade, from 1 microsecond to 100 seconds
+LATENCY_BUCKETS = tuple(10 ** (i / 10 - 6) for i in range(81))
+
+class LatencyHistogram:
+    '''
+    A histogram of latencies over fixed, logarithmically spaced buckets, so that it takes constant memory however many latencies it observes.
+    Percentiles are reported as the upper bound of the bucket they fall in, which overestimates them by at most 26%.
+    '''
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1) # the last bucket holds latencies above the largest bound
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def merge(self, other):
+        '''
+        Add the latencies observed by the LatencyHistogram :other: to this one.
+        '''
+        self.counts = [c1 + c2 for c1, c2 in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def percentile(self, q):
+        '''
+        :return: the (bucketed) :q:th percentile of the latencies, or None if none have been observed
+        '''
+        if self.count == 0:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else float('inf')
+
+    def snapshot(self):
+        return {'count': self.count,
+                'mean': self.sum / self.count if self.count > 0 else None,
+                'p50': self.percentile(50),
+                'p95': self.percentile(95),
+                'p99': self.percentile(99)}
+
+class InferenceMetrics:
+    '''
+    Counters of how a trained ATP model inflects lemmas at serving time (see ATP's :collect_metrics: parameter):
+        - the number of inflections made at each leaf, and how many of them were guesses
+        - the number of inflections that were memorized, productive, or guessed
+        - for inflect_no_feat, a histogram of the number of leaves that each lemma's phonology is compatible with (more than one is ambiguous)
+        - a LatencyHistogram of each entry point (inflect, inflect_no_feat, and inflect_many)
+    Inflections served from the model's cache are counted as the leaf that first made them (see ATP.cached), so the counts are the same with or without a cache.
+    It is safe to share between threads: every update holds a lock.
+    '''
+    def __init__(self):
+        self.lock = Lock()
+        self.reset()
+
+    def __getstate__(self):
+        # locks cannot be pickled
+        return {key: value for key, value in self.__dict__.items() if key != 'lock'}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = Lock()
+
+    def reset(self):
+        '''
+        Zero every counter.
+        '''
+        with self.lock:
+            self.leaf_hits = Counter() # maps a leaf's name to the number of inflections made at it
+            self.leaf_guesses = Counter() # maps a leaf's name to the number of those that were guesses
+            self.outcomes = Counter() # maps MEMORIZED, PRODUCTIVE, and GUESSED to their number of inflections
+            self.no_feat_compatible_leaves = Counter() # maps a number of leaves to the number of inflect_no_feat lemmas compatible with that many
+            self.latencies = dict() # maps an entry point to its LatencyHistogram
+
+    def observe_leaf(self, leaf, outcome):
+        '''
+        Record an inflection made at :leaf: with :outcome: (MEMORIZED, PRODUCTIVE, or GUESSED).
+        '''
+        with self.lock:
+            self.leaf_hits[leaf.name] += 1
+            if outcome == GUESSED:
+                self.leaf_guesses[leaf.name] += 1
+            self.outcomes[outcome] += 1
+
+    def observe_compatible_leaves(self, num_leaves):
+        '''
+        Record that an inflect_no_feat lemma was compatible with :num_leaves: leaves.
+        '''
+        with self.lock:
+            self.no_feat_compatible_leaves[num_leaves] += 1
+
+    def observe_latency(self, entry_point, seconds):
+        '''
+        Record a call to :entry_point: that took :seconds:.
+        '''
+        with self.lock:
+            if entry_point not in self.latencies:
+                self.latencies[entry_point] = LatencyHistogram()
+            self.latencies[entry_point].observe(seconds)
+
+    def merge(self, other):
+        '''
+        Add the counts of the InferenceMetrics :other: (e.g., from a worker process) to these.
+        '''
+        with self.lock:
+            self.leaf_hits.update(other.leaf_hits)
+            self.leaf_guesses.update(other.leaf_guesses)
+            self.outcomes.update(other.outcomes)
+            self.no_feat_compatible_leaves.update(other.no_feat_compatible_leaves)
+            for entry_point, histogram in other.latencies.items():
+                self.latencies.setdefault(entry_point, LatencyHistogram()).merge(histogram)
+
+    def snapshot(self):
+        '''
+        :return: a JSON-serializable dict of the current counts, with latency percentiles in seconds
+        '''
+        with self.lock:
+            total = sum(self.outcomes.values())
+            return {'inflections': total,
+                    'outcomes': {outcome: self.outcomes[outcome] for outcome in (MEMORIZED, PRODUCTIVE, GUESSED)},
+                    'guess_rate': self.outcomes[GUESSED] / total if total > 0 else 0,
+                    'leaf_hits': dict(self.leaf_hits.most_common()),
+                    'leaf_guesses': dict(self.leaf_guesses.most_common()),
+                    'no_feat_compatible_leaves': {str(n): count for n, count in sorted(self.no_feat_compatible_leaves.items())},
+                    'no_feat_ambiguous': sum(count for n, count in self.no_feat_compatible_leaves.items() if n > 1),
+                    'latency': {entry_point: histogram.snapshot() for entry_point, histogram in self.latencies.items()}}
@@ -0,0 +1,67 @@
+from collections import OrderedDict
+from threading import Lock
+
+class InflectionCache:
+    '''
+    A size-bounded cache of inflections, which evicts the least recently used entry once it is full.
+    It is safe to share between threads: every access (including reads, which update the recency order) holds a lock.
+    '''
+    def __init__(self, maxsize=1024):
+        '''
+        :maxsize: the maximum number of entries to keep
+        '''
+        assert(maxsize > 0)
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getstate__(self):
+        # locks cannot be pickled, and the entries are cheap to recompute, so a pickled cache starts out empty
+        return {'maxsize': self.maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(state['maxsize'])
+
+    def get(self, key):
+        '''
+        :return: the value cached for :key:, or None if it is not cached
+        '''
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        '''
+        Cache :value: for :key:, evicting the least recently used entry if the cache is full.
+        '''
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        '''
+        Empty the cache and reset its counters.
+        '''
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        '''
+        :return: a dict with the cache's hits, misses, current size, and maximum size
+        '''
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries), 'maxsize': self.maxsize}
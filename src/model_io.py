@@ -0,0 +1,405 @@
+import sys
+import json
+import mmap
+import struct
+from bisect import bisect_left
+from array import array
+
+import numpy as np
+
+from tp_switch_statement import TPSwitchStatement
+from case import Case, SUFFIX, MEMORIZED, IDENTITY
+from semantic_condition import SemanticCondition
+from phonological_condition import PhonologicalCondition
+from compiled_atp import CompiledATP, LEAF, SEMANTIC, PHONOLOGICAL
+from utils import encode_words, hamming_distances
+from vocab import Vocab
+
+# A compact on-disk format for trained ATP models. A model file is laid out as
+#     MAGIC (8 bytes) | header length (uint64, little-endian) | JSON header | padding to a multiple of 8 bytes | columns | string blob
+# The JSON header only holds the small tables: the feature space, the distinct branch conditions, the distinct feature tuples, and the length of each column.
+# The columns are little-endian int32 arrays (uint32 for the codes), stored one after another in the order of COLUMNS:
+#     - node columns, with one entry per node of the tree (the root is node 0), hold the tree's topology and each node's name
+#     - leaf columns, with one entry per leaf. The offset columns (leaf_entries, leaf_cases, leaf_codes) have one more entry,
+#       so that the rows of leaf i are those from column[i] up to column[i + 1].
+#     - vocab entry columns, with one entry per (lemma, inflected, features) of a leaf's vocab. Each leaf's entries are sorted,
+#       and known holds the inflection that the leaf memorized for the entry's (lemma, features), or -1 if there is none.
+#     - case columns, with one entry per case of a leaf's switch statement (its default case is its last), and, in members, the vocab entries that each case covers
+#     - codes, the lemmas of each unproductive leaf encoded for guessing (see utils.encode_words)
+# Every string (lemmas, inflections, suffixes, and node names) is stored once, in a shared UTF-8 blob at the end of the file,
+# and is referred to by its id: string i runs from string_offsets[i] to string_offsets[i + 1] in the blob.
+# Since everything but the header is stored in columns, a model can be memory-mapped and shared by every process that loads the same file.
+
+MAGIC = b'ATPMODEL'
+VERSION = 2
+COLUMNS = ('kinds', 'condition_ids', 'pos_child', 'neg_child', 'leaf_ids', 'name_ids', # node columns
+           'leaf_names', 'leaf_productive', 'leaf_entries', 'leaf_cases', 'leaf_codes', # leaf columns
+           'lemmas', 'inflections', 'bundle_ids', 'lemma_lengths', 'known', # vocab entry columns
+           'case_kinds', 'case_payloads', 'case_inflections', 'case_members', 'members', # case columns
+           'string_offsets', 'codes')
+ARRAYS = {'lemma_lengths': '<i4', 'codes': '<u4'} # the columns that are read as numpy arrays, for computing Hamming distances
+CASE_KINDS = (SUFFIX, MEMORIZED, IDENTITY)
+
+class StringTable:
+    '''
+    The strings of a model file, decoded from the shared blob when they are needed.
+    '''
+    def __init__(self, offsets, blob):
+        '''
+        :offsets: a column where string i runs from offsets[i] to offsets[i + 1] in the :blob:
+        :blob: the UTF-8 encoded strings, one after another
+        '''
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        '''
+        :return: the string with id :i:
+        '''
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def encoded(self, i):
+        '''
+        :return: the UTF-8 bytes of the string with id :i:, which sort in the same order as the strings
+        '''
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]])
+
+class StringColumn:
+    '''
+    A read-only sequence of the strings whose ids are in a column.
+    '''
+    def __init__(self, strings, ids):
+        self.strings = strings
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        return self.strings[self.ids[i]]
+
+class MappedCompiledATP(CompiledATP):
+    '''
+    A CompiledATP that inflects straight from the columns of a model file (see load_compiled), instead of from leaf tables built in memory.
+
+    A memorized inflection is found by binary search over the lemmas of the leaf's sorted vocab entries,
+    and a guess by computing Hamming distances to the leaf's encoded lemmas, so no per-leaf table has to be built.
+    '''
+    def __init__(self, header, columns, strings):
+        '''
+        :header: the header of the model file
+        :columns: maps each name in COLUMNS to its column
+        :strings: the StringTable of the model file
+        '''
+        super().__init__(root=None)
+        self.columns = columns
+        self.strings = strings
+        self.kinds = columns['kinds']
+        self.pos_child = columns['pos_child']
+        self.neg_child = columns['neg_child']
+        self.leaf_ids = columns['leaf_ids']
+        payloads = [load_condition(description) for description in header['conditions']]
+        payloads = [condition.feature if condition.condition_type == 'Semantic' else condition.ending for condition in payloads]
+        self.conditions = [payloads[i] if i >= 0 else None for i in columns['condition_ids']]
+        self.leaf_names = StringColumn(strings, columns['leaf_names'])
+        self.leaf_productive = columns['leaf_productive']
+        self.bundle_ids = {tuple(feats): i for i, feats in enumerate(header['bundles'])}
+        self.phon_engine = None
+        if header['apply_phonology']:
+            from phon_engine import PhonEngine
+            self.phon_engine = PhonEngine()
+
+    def find_known(self, lemma, features, leaf):
+        '''
+        :return: the id of the inflection that :leaf: memorized for (:lemma:, :features:), or -1 if it memorized none
+        '''
+        bundle = self.bundle_ids.get(features)
+        if bundle is None:
+            return -1
+        lemmas, encoded = self.columns['lemmas'], self.strings.encoded
+        key = lemma.encode('utf-8')
+        start, end = self.columns['leaf_entries'][leaf], self.columns['leaf_entries'][leaf + 1]
+        # the leaf's entries are sorted, so a binary search finds the first whose lemma is not less than :lemma:
+        lo = start + bisect_left(range(start, end), key, key=lambda i: encoded(lemmas[i]))
+        if lo == end or encoded(lemmas[lo]) != key:
+            return -1
+        lemma_id = lemmas[lo] # strings are stored once, so the entries for :lemma: all have the same id
+        bundle_ids = self.columns['bundle_ids']
+        while lo < end and lemmas[lo] == lemma_id:
+            if bundle_ids[lo] == bundle:
+                return self.columns['known'][lo]
+            lo += 1
+        return -1
+
+    def inflect_default(self, lemma, leaf):
+        '''
+        :return: the inflection of :lemma: by the default case of :leaf:
+        '''
+        case = self.columns['leaf_cases'][leaf + 1] - 1
+        kind = CASE_KINDS[self.columns['case_kinds'][case]]
+        if kind == SUFFIX:
+            suffix = self.strings[self.columns['case_payloads'][case]]
+            if self.phon_engine is None:
+                return f'{lemma}{suffix}'
+            return self.phon_engine.apply_suffix(lemma, suffix)
+        if kind == MEMORIZED:
+            return self.strings[self.columns['case_inflections'][case]]
+        return lemma
+
+    def inflect_known(self, lemma, features, leaf):
+        known = self.find_known(lemma, features, leaf)
+        if known >= 0:
+            return self.strings[known]
+        if self.leaf_productive[leaf]:
+            return self.inflect_default(lemma, leaf)
+        return None
+
+    def guess_inflection(self, lemma, leaf):
+        '''
+        :return: an inflected form using the nearest-neighbor in the :leaf:'s vocab (using Hamming distance).
+        '''
+        columns = self.columns
+        lo, hi = columns['leaf_entries'][leaf], columns['leaf_entries'][leaf + 1]
+        start, stop = columns['leaf_codes'][leaf], columns['leaf_codes'][leaf + 1]
+        width = (stop - start) // (hi - lo) if hi > lo else 0
+        codes = columns['codes'][start:stop].reshape(hi - lo, width)
+        # ties go to the first of the (sorted) entries, as in NeighborIndex.nearest
+        i = lo + hamming_distances(lemma, (codes, columns['lemma_lengths'][lo:hi]), argmin=True)
+        closest_lemma, closest_inflected = self.strings[columns['lemmas'][i]], self.strings[columns['inflections'][i]]
+        return f'{lemma}{closest_inflected[len(closest_lemma):]}'
+
+def add_case(columns, strings, case, index):
+    '''
+    Append a row for :case: to the case columns.
+
+    :index: maps a (lemma, features) to the position of the first matching entry in the leaf's vocab
+    '''
+    columns['case_kinds'].append(CASE_KINDS.index(case.kind))
+    if case.kind == SUFFIX:
+        columns['case_payloads'].append(strings.add(case.payload))
+        columns['case_inflections'].append(-1)
+    elif case.kind == MEMORIZED:
+        columns['case_payloads'].append(strings.add(case.payload[0]))
+        columns['case_inflections'].append(strings.add(case.payload[1]))
+    else:
+        columns['case_payloads'].append(-1)
+        columns['case_inflections'].append(-1)
+    columns['members'].extend(sorted(index[key] for key in case.lemmas))
+    columns['case_members'].append(len(columns['members']))
+
+def add_leaf(columns, strings, bundles, codes, name, switch_statement):
+    '''
+    Append a row for a leaf to the leaf columns, along with its vocab entries and cases, with its strings added to the Vocab :strings:,
+    feature tuples replaced by their ids in the Vocab :bundles:, and its encoded lemmas (if it is unproductive) appended to the list :codes:.
+    '''
+    vocab = sorted(switch_statement.vocab)
+    index = dict()
+    for i, (lemma, inflected, feats) in enumerate(vocab):
+        index.setdefault((lemma, feats), i)
+        columns['lemmas'].append(strings.add(lemma))
+        columns['inflections'].append(strings.add(inflected))
+        columns['bundle_ids'].append(bundles.add(feats))
+        columns['lemma_lengths'].append(len(lemma))
+        case = switch_statement.lookup(lemma, feats)
+        columns['known'].append(strings.add(case.inflect(lemma)) if case is not None else -1)
+    # the cases refer to their lemmas by position in the (sorted) vocab
+    for case in switch_statement.cases + [switch_statement.default_case]:
+        add_case(columns, strings, case, index)
+    if not switch_statement.productive:
+        encoded, _ = encode_words([lemma for lemma, _, _ in vocab])
+        codes.append(encoded)
+        columns['leaf_codes'].append(columns['leaf_codes'][-1] + encoded.size)
+    else:
+        columns['leaf_codes'].append(columns['leaf_codes'][-1])
+    columns['leaf_names'].append(strings.add(name))
+    columns['leaf_productive'].append(int(switch_statement.productive))
+    columns['leaf_entries'].append(len(columns['lemmas']))
+    columns['leaf_cases'].append(len(columns['case_kinds']))
+
+def save(atp, path):
+    '''
+    Save a trained ATP model to :path:. Saving the same tree always produces the same bytes.
+    '''
+    columns = {name: array('i') for name in COLUMNS if name != 'codes'}
+    for name in ('leaf_entries', 'leaf_cases', 'leaf_codes', 'case_members'):
+        columns[name].append(0)
+    strings = Vocab()
+    codes = list()
+    conditions = list()
+    condition_ids = dict()
+    bundles = Vocab()
+    # number the nodes in pre-order
+    frontier = [(atp.root, -1, True)]
+    while len(frontier) != 0:
+        node, parent, pos = frontier.pop()
+        node_id = len(columns['kinds'])
+        if parent >= 0:
+            (columns['pos_child'] if pos else columns['neg_child'])[parent] = node_id
+        columns['name_ids'].append(strings.add(node.name))
+        for name in ('pos_child', 'neg_child', 'leaf_ids', 'condition_ids'):
+            columns[name].append(-1)
+        if node.num_children() == 0:
+            columns['kinds'].append(LEAF)
+            columns['leaf_ids'][node_id] = len(columns['leaf_names'])
+            add_leaf(columns, strings, bundles, codes, node.name, node.switch_statement)
+            continue
+        children = node.get_children()
+        _, condition = children[0][0]
+        if condition not in condition_ids:
+            condition_ids[condition] = len(conditions)
+            if condition.condition_type == 'Semantic':
+                conditions.append([SEMANTIC, condition.feature])
+            else:
+                conditions.append([PHONOLOGICAL, condition.ending if condition.singleton else list(condition.ending)])
+        columns['kinds'].append(SEMANTIC if condition.condition_type == 'Semantic' else PHONOLOGICAL)
+        columns['condition_ids'][node_id] = condition_ids[condition]
+        for (pos, _), child in reversed(children):
+            frontier.append((child, node_id, pos))
+
+    encoded_strings = [string.encode('utf-8') for string in strings.items]
+    columns['string_offsets'].append(0)
+    for string in encoded_strings:
+        columns['string_offsets'].append(columns['string_offsets'][-1] + len(string))
+    codes = np.concatenate([encoded.reshape(-1) for encoded in codes]).astype('<u4') if len(codes) > 0 else np.zeros(0, dtype='<u4')
+    lengths = {name: len(columns[name]) if name != 'codes' else len(codes) for name in COLUMNS}
+    header = json.dumps({'version': VERSION,
+                         'feature_space': sorted(condition.feature for condition in atp.feature_space),
+                         'apply_phonology': atp.apply_phonology,
+                         'conditions': conditions,
+                         'bundles': [list(feats) for feats in bundles.items],
+                         'lengths': lengths}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    padding = -(len(MAGIC) + 8 + len(header)) % 8
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        f.write(b'\0' * padding)
+        for name in COLUMNS:
+            if name == 'codes':
+                f.write(codes.tobytes())
+                continue
+            column = columns[name]
+            if sys.byteorder != 'little':
+                column.byteswap()
+            f.write(column.tobytes())
+        f.write(b''.join(encoded_strings))
+
+def read(path, use_mmap=True):
+    '''
+    Read a model file.
+
+    :use_mmap: if True, the columns and strings are views into a read-only memory map of the file, which is shared by all processes that map it.
+
+    :return: a tuple (header, columns, strings), where columns maps each name in COLUMNS to an indexable column of ints
+        (a numpy array for those in ARRAYS), and strings is the StringTable of the file
+    '''
+    with open(path, 'rb') as f:
+        if use_mmap:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = f.read()
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError(f'{path} is not an ATP model file')
+    header_length, = struct.unpack('<Q', buffer[len(MAGIC):len(MAGIC) + 8])
+    start = len(MAGIC) + 8
+    header = json.loads(bytes(buffer[start:start + header_length]).decode('utf-8'))
+    if header['version'] != VERSION:
+        raise ValueError(f"Unsupported ATP model version {header['version']}")
+    offset = start + header_length
+    offset += -offset % 8
+    columns = dict()
+    for name in COLUMNS:
+        n = header['lengths'][name]
+        if name in ARRAYS:
+            column = np.frombuffer(buffer, dtype=ARRAYS[name], count=n, offset=offset)
+        elif sys.byteorder == 'little':
+            column = memoryview(buffer)[offset:offset + 4 * n].cast('i')
+        else:
+            column = array('i', buffer[offset:offset + 4 * n])
+            column.byteswap()
+        columns[name] = column
+        offset += 4 * n
+    blob = memoryview(buffer)[offset:offset + columns['string_offsets'][-1]]
+    return header, columns, StringTable(columns['string_offsets'], blob)
+
+def load_condition(description):
+    '''
+    :return: the (interned) Condition described by :description:
+    '''
+    kind, payload = description
+    if kind == SEMANTIC:
+        return SemanticCondition(payload)
+    return PhonologicalCondition(payload if type(payload) is str else tuple(payload))
+
+def load_case(switch_statement, columns, strings, case, vocab):
+    '''
+    :return: a Case for :switch_statement: that is rebuilt from row :case: of the case columns, with its lemmas taken from the leaf's :vocab:
+    '''
+    kind = CASE_KINDS[columns['case_kinds'][case]]
+    if kind == SUFFIX:
+        res = switch_statement.suffix_case(strings[columns['case_payloads'][case]])
+    elif kind == MEMORIZED:
+        res = switch_statement.memorized_case(strings[columns['case_payloads'][case]], strings[columns['case_inflections'][case]])
+    else:
+        res = Case(IDENTITY)
+    members = columns['members'][columns['case_members'][case]:columns['case_members'][case + 1]]
+    res.lemmas = set((vocab[i][0], vocab[i][2]) for i in members)
+    return res
+
+def load_leaf(columns, strings, bundles, leaf, apply_phonology):
+    '''
+    :return: the TPSwitchStatement of :leaf:, rebuilt from the columns
+    '''
+    tp = TPSwitchStatement(apply_phonology=apply_phonology)
+    entries = range(columns['leaf_entries'][leaf], columns['leaf_entries'][leaf + 1])
+    vocab = [(strings[columns['lemmas'][i]], strings[columns['inflections'][i]], bundles[columns['bundle_ids'][i]]) for i in entries]
+    tp.vocab = set(vocab)
+    tp.productive = bool(columns['leaf_productive'][leaf])
+    first, default = columns['leaf_cases'][leaf], columns['leaf_cases'][leaf + 1] - 1
+    for case in range(first, default):
+        tp.add_case(load_case(tp, columns, strings, case, vocab))
+    tp.add_case(load_case(tp, columns, strings, default, vocab), default=True)
+    return tp
+
+def load(path):
+    '''
+    :return: the ATP model saved at :path:
+    '''
+    from atp import ATP # imported here, since atp.py imports this module
+
+    header, columns, strings = read(path, use_mmap=False)
+    atp = ATP(feature_space=header['feature_space'], apply_phonology=header['apply_phonology'])
+    bundles = [tuple(feats) for feats in header['bundles']]
+    conditions = [load_condition(description) for description in header['conditions']]
+    kinds, condition_ids, pos_child, neg_child, leaf_ids = (columns[name] for name in ('kinds', 'condition_ids', 'pos_child', 'neg_child', 'leaf_ids'))
+    nodes = list()
+    for i, name_id in enumerate(columns['name_ids']):
+        switch_statement = None
+        if kinds[i] == LEAF:
+            switch_statement = load_leaf(columns, strings, bundles, leaf_ids[i], header['apply_phonology'])
+        nodes.append(ATP.Node(strings[name_id], switch_statement, productive=switch_statement is not None and switch_statement.productive))
+    for i, node in enumerate(nodes):
+        if kinds[i] != LEAF:
+            condition = conditions[condition_ids[i]]
+            for child in (pos_child[i], neg_child[i]): # nodes are numbered in pre-order, so parents come before their children
+                if child >= 0:
+                    nodes[child].depth = node.depth + 1
+            if pos_child[i] >= 0:
+                node.add_child(left=True, branch_condition=(True, condition), child_node=nodes[pos_child[i]])
+            if neg_child[i] >= 0:
+                node.add_child(left=False, branch_condition=(False, condition), child_node=nodes[neg_child[i]])
+    atp.root = nodes[0]
+    atp.summarize(atp.root)
+    return atp
+
+def load_compiled(path, use_mmap=True):
+    '''
+    Load the model saved at :path: directly into a CompiledATP, without building the tree's nodes or any leaf's switch statement.
+
+    :use_mmap: if True, the compiled tree inflects from views into a shared, read-only memory map of the file.
+    '''
+    header, columns, strings = read(path, use_mmap=use_mmap)
+    return MappedCompiledATP(header, columns, strings)
@@ -0,0 +1,31 @@
+from utils import encode_words, hamming_distances
+
+class NeighborIndex:
+    '''
+    A nearest-neighbor index over the lemmas of a switch statement's vocab, for guessing inflections at unproductive leaves.
+
+    The lemmas are encoded once (see utils.encode_words), so the Hamming distance from a query to every lemma is computed in one vectorised pass.
+    The entries are kept in sorted order, and ties go to the first of them, so the nearest neighbor does not depend on the order of the vocab.
+    '''
+    def __init__(self, vocab):
+        '''
+        :vocab: an iterable of (lemma, inflected, feats) triples
+        '''
+        self.entries = sorted(vocab)
+        self.encoded = encode_words([lemma for lemma, _, _ in self.entries])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def distances(self, lemma):
+        '''
+        :return: an array of the Hamming distance from :lemma: to each entry's lemma
+        '''
+        return hamming_distances(lemma, self.encoded)
+
+    def nearest(self, lemma):
+        '''
+        :return: the (lemma, inflected, feats) entry whose lemma is closest to :lemma:, or None if the index is empty
+        '''
+        i = hamming_distances(lemma, self.encoded, argmin=True)
+        return self.entries[i] if i is not None else None
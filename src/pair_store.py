@@ -0,0 +1,177 @@
+import numpy as np
+from vocab import Vocab
+
+class PairStore:
+    '''
+    The training pairs and their labels, shared by every node of an ATP decision tree during training.
+    A node refers to its pairs by an array of indices into the store, so growing the tree never copies pairs.
+
+    The store also holds a matrix with one boolean row per branch condition, recording which of the pairs the condition applies to.
+    Each condition is evaluated over the pairs only once, the first time it is needed; every later check at any node is a lookup into its row.
+    Semantic conditions never change and phonological conditions are only ever added, so the matrix simply grows by a row per new condition.
+    Pairs can also be added after the fact (see extend), for which the matrix keeps spare columns.
+    '''
+    def __init__(self, pairs, label_ids, conditions=()):
+        '''
+        :pairs: the training pairs
+        :label_ids: an int array of the "labels" (effectively suffixes) of the training pairs (see ATP.build_labels)
+        :conditions: conditions to evaluate up front
+        '''
+        assert(len(pairs) == len(label_ids))
+        self.pairs = pairs
+        self.label_ids = np.asarray(label_ids, dtype=np.int64)
+        # the distinct feature tuples, and the id of each pair's tuple
+        self.bundles = Vocab()
+        self.bundle_ids = self.bundles.ids([feats for _, _, feats in pairs])
+        # maps an ending length to an array of each lemma's ending of that length
+        self.lemma_endings = dict()
+        # the condition-by-pair matrix, which has spare rows (and, once pairs are added, spare columns) to grow into
+        self.condition_rows = dict()
+        self.masks = np.zeros((max(len(conditions), 8), len(pairs)), dtype=bool)
+        for condition in conditions:
+            self.row(condition)
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def all_indices(self):
+        '''
+        :return: an index array of every pair in the store
+        '''
+        return np.arange(len(self.pairs))
+
+    def pairs_of(self, indices):
+        '''
+        :return: a list of the pairs at :indices:
+        '''
+        pairs = self.pairs
+        return [pairs[i] for i in indices.tolist()]
+
+    def extend(self, pairs, label_ids):
+        '''
+        Add :pairs: and their :label_ids: to the end of the store, evaluating the conditions seen so far on only the new pairs.
+        When the matrix runs out of columns, their number is doubled, so adding pairs takes amortized time linear in the number added.
+        '''
+        assert(len(pairs) == len(label_ids))
+        start = len(self.pairs)
+        self.pairs.extend(pairs)
+        self.label_ids = np.concatenate([self.label_ids, np.asarray(label_ids, dtype=np.int64)])
+        self.bundle_ids = np.concatenate([self.bundle_ids, self.bundles.ids([feats for _, _, feats in pairs])])
+        for length, endings in self.lemma_endings.items():
+            self.lemma_endings[length] = np.concatenate([endings, np.array([lemma[-length:] for lemma, _, _ in pairs], dtype=f'U{length}')])
+        if len(self.pairs) > self.masks.shape[1]:
+            masks = np.zeros((self.masks.shape[0], max(2 * self.masks.shape[1], len(self.pairs))), dtype=bool)
+            masks[:, :start] = self.masks[:, :start]
+            self.masks = masks
+        for condition, i in self.condition_rows.items():
+            self.masks[i, start:len(self.pairs)] = self.evaluate(condition, start)
+
+    def relabel(self, indices, label_ids):
+        '''
+        Change the labels of the pairs at :indices: to :label_ids:.
+        '''
+        self.label_ids[indices] = label_ids
+
+    def endings_of_length(self, length):
+        '''
+        :return: an array of the final :length: characters of each lemma (or the whole lemma, if it is shorter)
+        '''
+        if length not in self.lemma_endings:
+            self.lemma_endings[length] = np.array([lemma[-length:] for lemma, _, _ in self.pairs], dtype=f'U{length}')
+        return self.lemma_endings[length]
+
+    def evaluate(self, condition, start=0):
+        '''
+        :return: a boolean array that is True where :condition: applies to the pair, for the pairs from :start: on
+        '''
+        if condition.condition_type == 'Semantic':
+            # evaluate the condition once per distinct feature tuple
+            applies = np.fromiter((condition.applies('', feats) for feats in self.bundles), dtype=bool, count=len(self.bundles))
+            return applies[self.bundle_ids[start:]]
+        res = np.zeros(len(self.pairs) - start, dtype=bool)
+        for ending in ((condition.ending,) if condition.singleton else condition.ending):
+            res |= self.endings_of_length(len(ending))[start:] == ending
+        return res
+
+    def row(self, condition):
+        '''
+        :return: the row of :condition: in the condition-by-pair matrix, evaluating the condition if it has not been seen before.
+        '''
+        if condition not in self.condition_rows: # conditions are hashed by value
+            i = len(self.condition_rows)
+            if i == self.masks.shape[0]: # double the number of rows
+                self.masks = np.concatenate([self.masks, np.zeros_like(self.masks)])
+            self.masks[i, :len(self.pairs)] = self.evaluate(condition)
+            self.condition_rows[condition] = i
+        return self.condition_rows[condition]
+
+    def mask(self, condition, indices):
+        '''
+        :return: a boolean array, aligned with :indices:, that is True where :condition: applies to the pair
+        '''
+        return self.masks[self.row(condition), indices]
+
+    def count_applies(self, conditions, indices):
+        '''
+        :return: an array with the number of pairs at :indices: that each of :conditions: applies to
+        '''
+        rows = [self.row(condition) for condition in conditions]
+        return self.masks[np.ix_(rows, indices)].sum(axis=1)
+
+    def split_consistencies(self, conditions, indices, chunk_size=1 << 24):
+        '''
+        Score splitting the pairs at :indices: on each of :conditions: at once.
+        The label counts on each side of every split are computed with one bincount per chunk of conditions,
+        where chunks are sized to keep the (conditions x pairs) sub-matrix below :chunk_size: entries.
+
+        :return: a (len(conditions), 2) array with the consistency of the pairs that each condition does and does not apply to
+        '''
+        res = np.zeros((len(conditions), 2))
+        n = len(indices)
+        if n == 0 or len(conditions) == 0:
+            return res
+        _, node_labels = np.unique(self.label_ids[indices], return_inverse=True)
+        m = int(node_labels.max()) + 1
+        label_counts = np.bincount(node_labels, minlength=m)
+        step = max(1, chunk_size // n)
+        for start in range(0, len(conditions), step):
+            applies_counts = self.applies_counts(conditions[start:start + step], indices, node_labels, m)
+            res[start:start + len(applies_counts)] = PairStore.consistencies(applies_counts, label_counts)
+        return res
+
+    def applies_counts(self, conditions, indices, node_labels, m):
+        '''
+        :node_labels: the label of each pair at :indices:, numbered from 0 to :m: - 1
+
+        :return: a (len(conditions), :m:) array with the number of pairs at :indices: of each label that each of :conditions: applies to
+        '''
+        rows = np.fromiter((self.row(condition) for condition in conditions), dtype=np.int64, count=len(conditions))
+        sub = self.masks[np.ix_(rows, indices)]
+        condition_ids, positions = np.nonzero(sub)
+        return np.bincount(condition_ids * m + node_labels[positions], minlength=len(rows) * m).reshape(len(rows), m)
+
+    @staticmethod
+    def consistencies(applies_counts, label_counts):
+        '''
+        :applies_counts: a (conditions x labels) array with the number of pairs of each label that each condition applies to
+        :label_counts: the number of pairs of each label
+
+        :return: a (conditions, 2) array with the consistency of the pairs that each condition does and does not apply to
+        '''
+        k = len(applies_counts)
+        res = np.zeros((k, 2))
+        for side, counts in enumerate((applies_counts, label_counts - applies_counts)):
+            totals = counts.sum(axis=1)
+            # the relative frequency of the most frequent label (or 0 if no pairs are on this side)
+            res[:, side] = np.divide(counts.max(axis=1), totals, out=np.zeros(k), where=totals > 0)
+        return res
+
+    def consistency(self, indices):
+        '''
+        :return: the relative frequency of the most frequent label among the pairs at :indices:
+        '''
+        n = len(indices)
+        if n == 0:
+            return 0
+        c = int(np.bincount(self.label_ids[indices]).max()) # the frequency of the most frequent label
+        return c / n
@@ -0,0 +1,75 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from training_profile import TrainingProfile
+
+# the model being trained and its PairStore, set once per worker process
+_worker_atp = None
+_worker_store = None
+
+def mp_context():
+    '''
+    :return: the fork multiprocessing context where it is available (so that workers share the parent's memory rather than copying it), or None for the default
+    '''
+    return multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+
+def init_worker(atp, store):
+    '''
+    Initialize a worker process. With the fork start method, :store: is shared with the parent process rather than copied.
+    '''
+    global _worker_atp, _worker_store
+    _worker_atp = atp
+    _worker_store = store
+
+def build_subtree(indices, split_options, path_string, ending_statistics, depth):
+    '''
+    Build the subtree rooted at a node, serially, in a worker process.
+
+    :return: a tuple (node, node_profiles), where node_profiles is a list of the subtree's NodeProfiles if training is being profiled, and None otherwise
+    '''
+    if _worker_atp.profile is not None:
+        _worker_atp.profile = TrainingProfile() # profile only this subtree, for the calling process to merge
+    node = _worker_atp.build_node(store=_worker_store,
+                                  indices=indices,
+                                  split_options=split_options,
+                                  path_string=path_string,
+                                  ending_statistics=ending_statistics,
+                                  depth=depth)
+    return node, (_worker_atp.profile.nodes if _worker_atp.profile is not None else None)
+
+class ParallelBuild:
+    '''
+    The state of a parallel ATP.train. The nodes above :depth: are built serially by the calling process,
+    while the subtrees rooted at :depth: are built by a pool of worker processes and stitched back into the tree once they are done.
+    '''
+    def __init__(self, atp, store, n_jobs, depth):
+        '''
+        :atp: the ATP model being trained
+        :store: the PairStore of the training pairs
+        :n_jobs: the number of worker processes
+        :depth: the depth of the subtrees to build in the workers
+        '''
+        self.executor = ProcessPoolExecutor(max_workers=n_jobs, mp_context=mp_context(), initializer=init_worker, initargs=(atp, store))
+        self.profile = atp.profile
+        self.depth = depth
+        self.pending = list()
+
+    def submit(self, node, left, branch_condition, indices, split_options, path_string, ending_statistics, depth):
+        '''
+        Build the subtree for a child of :node: in a worker process.
+        '''
+        future = self.executor.submit(build_subtree, indices, split_options, path_string, ending_statistics, depth)
+        self.pending.append((node, left, branch_condition, future))
+
+    def join(self):
+        '''
+        Wait for the workers and add their subtrees to the tree (and, if training is being profiled, their NodeProfiles to the profile).
+        '''
+        try:
+            for node, left, branch_condition, future in self.pending:
+                child_node, node_profiles = future.result()
+                node.add_child(left=left, branch_condition=branch_condition, child_node=child_node)
+                if self.profile is not None:
+                    self.profile.nodes.extend(node_profiles)
+        finally:
+            self.executor.shutdown(cancel_futures=True)
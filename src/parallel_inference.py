@@ -0,0 +1,54 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from parallel_build import mp_context
+
+# the model being served, set once per worker process
+_worker_atp = None
+
+def init_worker(atp):
+    '''
+    Initialize a worker process. With the fork start method, :atp: is shared with the parent process rather than copied.
+    '''
+    global _worker_atp
+    _worker_atp = atp
+
+def inflect_batch(batch):
+    '''
+    Inflect a batch of (lemma, inflected, features) triples in a worker process.
+
+    :return: a tuple (preds, metrics), where preds is a list of inflected forms aligned with :batch:,
+        and metrics is the InferenceMetrics of the batch if the model collects metrics, and None otherwise
+    '''
+    metrics = _worker_atp.metrics
+    if metrics is not None:
+        metrics.reset() # report only this batch, for the calling process to merge
+    preds, _ = _worker_atp.inflect_many([lemma for lemma, _, _ in batch], [feats for _, _, feats in batch])
+    return preds, metrics
+
+def inflect_batches(atp, batches, n_jobs):
+    '''
+    Inflect batches of pairs in a pool of worker processes.
+    Batches are handed out as workers free up, but the results are yielded in input order.
+    At most 2 * :n_jobs: batches are in flight at a time, so memory stays flat however many batches there are.
+
+    :atp: a trained ATP model
+    :batches: an iterable of lists of (lemma, inflected, features) triples
+    :n_jobs: the number of worker processes
+
+    :return: a generator of lists of inflected forms, one list per batch. If :atp: collects metrics, the workers' metrics are merged into them.
+    '''
+    def result(future):
+        preds, metrics = future.result()
+        if metrics is not None:
+            atp.metrics.merge(metrics)
+        return preds
+
+    with ProcessPoolExecutor(max_workers=n_jobs, mp_context=mp_context(), initializer=init_worker, initargs=(atp,)) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(inflect_batch, batch))
+            if len(pending) >= 2 * n_jobs:
+                yield result(pending.popleft())
+        while len(pending) != 0:
+            yield result(pending.popleft())
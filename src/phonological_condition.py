@@ -1,20 +1,29 @@
 from condition import Condition
+from suffix_trie import SuffixTrie
 
 class PhonologicalCondition(Condition):
     '''
     A subclass of a branching Condition, which determines whether an ending has one of a set of endings.
     '''
+    # beyond this many endings, a SuffixTrie is faster than str.endswith over a tuple of endings
+    TRIE_THRESHOLD = 32
+
     def __init__(self, ending):
+        if hasattr(self, 'name'): # an interned condition that was already initialized
+            return
         self.ending = ending
         self.singleton = type(ending) is str
         if self.singleton:
             self.name = f'{ending}#'
         else:
             self.name = f"[{'|'.join(ending)}]#"
+        self.trie = SuffixTrie(ending) if not self.singleton and len(ending) > PhonologicalCondition.TRIE_THRESHOLD else None
         super().__init__('Phonological')
 
+    def __getnewargs__(self):
+        return (self.ending,)
+
     def applies(self, lemma, features):
-        if self.singleton:
-            return lemma.endswith(self.ending)
-        else:
-            return any(lemma.endswith(e) for e in self.ending)
\ No newline at end of file
+        if self.trie is not None:
+            return self.trie.matches(lemma)
+        return lemma.endswith(self.ending) # str.endswith accepts a single ending or a tuple of endings
\ No newline at end of file
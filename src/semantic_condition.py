@@ -5,9 +5,30 @@ class SemanticCondition(Condition):
     A subclass of a branching Condition, which determines whether an ending has a particular semantic feature.
     '''
     def __init__(self, feature):
+        if hasattr(self, 'name'): # an interned condition that was already initialized
+            return
         self.feature = feature
         self.name = feature
         super().__init__('Semantic')
 
+    def __getnewargs__(self):
+        return (self.feature,)
+
     def applies(self, lemma, features):
-        return self.feature in features
\ No newline at end of file
+        return self.feature in features
+
+    def partition(self, lemmas, features, indices):
+        '''
+        Split a batch in a single pass, evaluating the condition only once per distinct feature tuple.
+        '''
+        applies, does_not_apply = list(), list()
+        bundle_applies = dict()
+        for i in indices:
+            feats = features[i]
+            if feats not in bundle_applies:
+                bundle_applies[feats] = self.feature in feats
+            if bundle_applies[feats]:
+                applies.append(i)
+            else:
+                does_not_apply.append(i)
+        return applies, does_not_apply
@@ -0,0 +1,51 @@
+class SuffixTrie:
+    '''
+    A trie over reversed strings, which determines whether a word ends with any of a set of endings
+    in time linear in the length of the word, regardless of how many endings are in the set.
+    '''
+    END = None # the key that marks the end of an ending
+
+    def __init__(self, endings=()):
+        '''
+        :endings: an iterable of endings to add to the trie
+        '''
+        self.root = dict()
+        self.size = 0
+        for ending in endings:
+            self.add(ending)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, ending):
+        '''
+        Add an ending to the trie.
+        '''
+        node = self.root
+        for char in reversed(ending):
+            node = node.setdefault(char, dict())
+        if SuffixTrie.END not in node:
+            node[SuffixTrie.END] = True
+            self.size += 1
+
+    def update(self, endings):
+        '''
+        Add each of :endings: to the trie.
+        '''
+        for ending in endings:
+            self.add(ending)
+
+    def matches(self, word):
+        '''
+        :return: True iff :word: ends with any of the endings in the trie.
+        '''
+        node = self.root
+        if SuffixTrie.END in node:
+            return True
+        for char in reversed(word):
+            node = node.get(char)
+            if node is None:
+                return False
+            if SuffixTrie.END in node:
+                return True
+        return False
@@ -1,5 +1,10 @@
+from collections import OrderedDict
+from sys import intern
+
 from utils import tolerance_principle
-from case import Case
+from vocab import Vocab
+from case import Case, SUFFIX, MEMORIZED, IDENTITY
+from neighbor_index import NeighborIndex
 
 class TPSwitchStatement:
     '''
@@ -15,16 +20,25 @@ class TPSwitchStatement:
         self.vocab = set()
         self.productive = False
         self.apply_phonology = apply_phonology
+        self.phon_engine = None
         if apply_phonology:
             # treats the various alomorphs for English /-d/ and /-z/ as identical.
             # This was only used in the developmental experiment in Fig. 1 of the paper, to keep it from getting cluttered.
             from phon_engine import PhonEngine
             self.phon_engine = PhonEngine()
 
-        self.cases = list()
-        self.default_case = Case(condition=lambda lemma, inflection: True, # the default case applies to everything
-                                 inflect=lambda lemma: lemma, # the default case just regurgitates the lemma
-                                 name='default-default')
+        # the cases of the switch statement, in order (the values are unused), so that a hit case can be moved to the front in constant time
+        self.case_order = OrderedDict()
+        # index the cases by what they explain: a suffix, or a memorized (lemma, inflection) pair
+        self.suffix_cases = dict()
+        self.memorized_cases = dict()
+        # the distinct case names, whose ids label the cases (so cases with the same name, e.g., memorizing the same inflection, share a label)
+        self.label_vocab = Vocab()
+        # maps each trained (lemma, feats) to the case that contains it, and records those contained by more than one case
+        self.lemma_index = dict()
+        self.ambiguous = set()
+        self.default_case = Case(IDENTITY) # the default case applies to everything and just regurgitates the lemma
+        self.neighbor_index = None # built over the vocab the first time it is needed (see guess)
 
         if pairs:
             self.train(pairs)
@@ -33,6 +47,7 @@ class TPSwitchStatement:
         '''
         :pairs: pairs to train on
         '''
+        self.neighbor_index = None
         for lemma, inflected, feats in pairs:
             self.vocab.add((lemma, inflected, feats))
             self.train_on_pair(lemma, inflected, feats)
@@ -43,23 +58,85 @@ class TPSwitchStatement:
         :inflected: the inflected form to train on
         :feats: the relevant features
         '''
-        # no need to do anything if we already have this case
-        cases = list(self.cases)
-        if self.default_case.name != 'default-default':
-            cases.append(self.default_case)
-        for case in cases:
-            res = case.apply(lemma, inflected, feats, train=True)
-            if res:
-                if case != self.default_case:
-                    # bring the case to beginning of the switch statement
-                    self.cases.insert(0, self.cases.pop(self.cases.index(case)))
-                return
-        # if no case applied, the default will, but we are training so that doesn't matter
-        # instead, add a new case for this pair
-        new_case = self.build_new_case(lemma, inflected)
-        if new_case:
-            new_case.apply(lemma, inflected, feats, train=True)
-            self.cases.append(new_case)
+        case = self.find_case(lemma, inflected)
+        if case is None:
+            # if no case applied, the default will, but we are training so that doesn't matter
+            # instead, add a new case for this pair
+            case = self.build_new_case(lemma, inflected)
+            self.add_case(case)
+        elif case is not self.default_case:
+            # bring the case to beginning of the switch statement
+            self.case_order.move_to_end(case, last=False)
+        case.lemmas.add((lemma, feats))
+        self.index_lemma((lemma, feats), case)
+
+    def index_lemma(self, key, case):
+        '''
+        Record that :case: contains the (lemma, feats) :key:.
+        '''
+        indexed = self.lemma_index.setdefault(key, case)
+        if indexed is not case:
+            self.ambiguous.add(key)
+
+    def find_case(self, lemma, inflected):
+        '''
+        :return: the first case of the switch statement (or its default case) that explains the (:lemma:, :inflected:) pair, or None if none does
+        '''
+        if self.apply_phonology:
+            # with phonology, several suffixes can produce the same inflection, so the first case that applies wins
+            for case in self.case_order:
+                if case.condition(lemma, inflected):
+                    return case
+            if self.default_case.kind != IDENTITY and self.default_case.condition(lemma, inflected):
+                return self.default_case
+            return None
+        # otherwise, exactly one suffix or memorized pair explains the inflection
+        if inflected.startswith(lemma):
+            return self.suffix_cases.get(inflected[len(lemma):])
+        return self.memorized_cases.get((lemma, inflected))
+
+    def add_case(self, case, default=False):
+        '''
+        Add a case to the switch statement.
+
+        :default: if True, the case becomes the default case; otherwise, it is added to the end of the switch statement
+        '''
+        if case.kind == SUFFIX:
+            self.suffix_cases[case.payload] = case
+        elif case.kind == MEMORIZED:
+            self.memorized_cases[case.payload] = case
+        case.label = self.label_vocab.add(case.name)
+        for key in case.lemmas:
+            self.index_lemma(key, case)
+        if default:
+            self.default_case = case
+        else:
+            self.case_order[case] = None
+
+    @property
+    def cases(self):
+        '''
+        :return: a list of the cases of the switch statement, in order
+        '''
+        return list(self.case_order)
+
+    def remove_case(self, case):
+        '''
+        Remove :case: from the switch statement's cases (e.g., to make it the default case).
+
+        :return: the position that it had in the cases
+        '''
+        position = next(i for i, other in enumerate(self.case_order) if other is case)
+        del self.case_order[case]
+        return position
+
+    def insert_case(self, position, case):
+        '''
+        Insert :case: into the switch statement's cases at :position:.
+        '''
+        cases = self.cases
+        cases.insert(position, case)
+        self.case_order = OrderedDict.fromkeys(cases)
 
     def apply_suffix(self, lemma, suffix):
         '''
@@ -73,13 +150,39 @@ class TPSwitchStatement:
         '''
         suffix = inflection[len(lemma):]
         if inflection.startswith(lemma) and inflection == self.apply_suffix(lemma, suffix):
-            return Case(condition=lambda _lemma, _inflection: _inflection == self.apply_suffix(_lemma, suffix), # this case applies when the inflection starts with the lemma
-                        inflect=lambda _lemma: self.apply_suffix(_lemma, suffix), # the case returns the lemma with this particular inflection's suffix
-                        name=f'inflected = lemma + {suffix}')
-        x, y = f'{lemma}', f'{inflection}'
-        return Case(condition=lambda _lemma, _inflection: (_lemma, _inflection) == (x, y), # this case applies only for this exact (lemma, inflection pair)
-                    inflect=lambda _lemma: inflection, # the case memorizes the inflection
-                    name=f'inflected = {inflection}')
+            return self.suffix_case(suffix)
+        return self.memorized_case(lemma, inflection)
+
+    def suffix_case(self, suffix):
+        '''
+        :return: a new Case that inflects a lemma by adding :suffix:
+        '''
+        return Case(SUFFIX, intern(suffix), phon_engine=self.phon_engine)
+
+    def memorized_case(self, lemma, inflection):
+        '''
+        :return: a new Case that memorizes the (:lemma:, :inflection:) pair
+        '''
+        return Case(MEMORIZED, (lemma, inflection))
+
+    def lookup(self, lemma, feats):
+        '''
+        :lemma: a lemma
+        :feats: the lemma's features
+
+        :return: the first case in the switch statement that contains the (:lemma:, :feats:), or None if none does
+        '''
+        key = (lemma, feats)
+        if key in self.ambiguous:
+            # the lemma was trained into several cases, so the order of the cases decides
+            for case in self.case_order:
+                if key in case.lemmas:
+                    return case
+            return None
+        case = self.lemma_index.get(key)
+        if case is self.default_case: # the default case is not part of the switch statement's list of cases
+            return None
+        return case
 
     def memorized(self, lemma, feats):
         '''
@@ -88,11 +191,7 @@ class TPSwitchStatement:
 
         :return: True if the lemma has been memorized, False otherwise
         '''
-        # search over cases in switch statement for the lemma's inflection
-        for case in self.cases:
-            if (lemma, feats) in case.lemmas:
-                return True
-        return False
+        return self.lookup(lemma, feats) is not None
 
     def inflect(self, lemma, feats):
         '''
@@ -103,12 +202,24 @@ class TPSwitchStatement:
         :lemma: a lemma to inflect
         :feats: the features of the lemma to inflect
         '''
-        # search over cases in switch statement for the lemma's inflection
-        for case in self.cases:
-            if (lemma, feats) in case.lemmas:
-                return case.inflect(lemma)
         # if the lemma is not found in any case, then apply the default case
-        return self.default_case.inflect(lemma)
+        return self.get_case(lemma, feats).inflect(lemma)
+
+    def inflect_known(self, lemma, feats):
+        '''
+        Inflect a lemma if it was memorized or the switch statement is productive, with a single lookup.
+
+        :lemma: a lemma to inflect
+        :feats: the features of the lemma to inflect
+
+        :return: the inflected form, or None if the inflection would have to be guessed
+        '''
+        case = self.lookup(lemma, feats)
+        if case is not None:
+            return case.inflect(lemma)
+        if self.productive:
+            return self.default_case.inflect(lemma)
+        return None
 
     def get_case(self, lemma, feats):
         '''
@@ -117,12 +228,25 @@ class TPSwitchStatement:
         :lemma: a lemma to inflect
         :feats: the features of the lemma to inflect
         '''
-        # search over cases in switch statement for the lemma's inflection
-        for case in self.cases:
-            if (lemma, feats) in case.lemmas:
-                return case
+        case = self.lookup(lemma, feats)
         # if the lemma is not found in any case, then return the default case
-        return self.default_case
+        return case if case is not None else self.default_case
+
+    def build_neighbor_index(self):
+        '''
+        :return: the NeighborIndex over the vocab, building it if it has not been built yet
+        '''
+        if self.neighbor_index is None:
+            self.neighbor_index = NeighborIndex(self.vocab)
+        return self.neighbor_index
+
+    def guess(self, lemma):
+        '''
+        :return: an inflected form for :lemma: that takes the suffix of its nearest neighbor (using Hamming distance) in the vocab
+        '''
+        closest_lemma, closest_inflected, _ = self.build_neighbor_index().nearest(lemma)
+        suffix_of_closest = closest_inflected[len(closest_lemma):]
+        return f'{lemma}{suffix_of_closest}'
 
     def get_productive(self):
         '''
@@ -132,8 +256,8 @@ class TPSwitchStatement:
         self.productive = False
         productive = list()
         n = len(self.vocab)
-        cases = list(self.cases)
-        if self.default_case.name != 'default-default': # the default-default case is a place-holder that just regurgitates the lemma, but is not productive
+        cases = self.cases
+        if self.default_case.kind != IDENTITY: # the default-default case is a place-holder that just regurgitates the lemma, but is not productive
             cases.append(self.default_case)
         for case in cases:
             c = len(case.lemmas)
@@ -152,7 +276,7 @@ class TPSwitchStatement:
         '''
         closest = None
         closest_val = 0
-        for case in self.cases:
+        for case in self.case_order:
             c = len(case.lemmas)
             if not closest or c > closest_val:
                 closest = case
@@ -0,0 +1,150 @@
+import json
+import time
+from collections import defaultdict
+
+# the phases of building a node, in the order they happen
+PHASES = ('ending_statistics', 'phonological_features', 'useless_splits', 'tp_switch_statement', 'neighbor_index', 'best_split')
+
+class NodeProfile:
+    '''
+    The profile of building one node of an ATP decision tree: the wall time of each phase, and the sizes that drive it.
+    '''
+    __slots__ = ('path', 'depth', 'num_pairs', 'num_split_options', 'num_phonological_conditions', 'leaf', 'seconds', 'phases', 'start', 'last')
+
+    def __init__(self, path, depth, num_pairs):
+        '''
+        :path: the path to the node
+        :depth: the depth of the node
+        :num_pairs: the number of training pairs at the node
+        '''
+        self.path = path
+        self.depth = depth
+        self.num_pairs = num_pairs
+        self.num_split_options = 0 # the candidate splits, after dropping uninformative ones
+        self.num_phonological_conditions = 0 # the phonological conditions proposed at the node
+        self.leaf = True
+        self.seconds = 0 # the time spent at the node itself, excluding its children
+        self.phases = dict.fromkeys(PHASES, 0)
+        self.start = self.last = time.perf_counter()
+
+    def lap(self, phase=None):
+        '''
+        Charge the time since the previous lap (or since the node was started) to :phase:, or to no phase if it is None.
+        '''
+        now = time.perf_counter()
+        if phase is not None:
+            self.phases[phase] += now - self.last
+        self.last = now
+
+    def count(self, **counts):
+        '''
+        Record sizes of the node (e.g., num_split_options).
+        '''
+        for name, value in counts.items():
+            setattr(self, name, value)
+
+    def finish(self):
+        '''
+        Stop the node's clock, when the node is done apart from its children.
+        '''
+        self.seconds = time.perf_counter() - self.start
+
+    def to_dict(self):
+        return {'path': self.path,
+                'depth': self.depth,
+                'num_pairs': self.num_pairs,
+                'num_split_options': self.num_split_options,
+                'num_phonological_conditions': self.num_phonological_conditions,
+                'leaf': self.leaf,
+                'seconds': self.seconds,
+                # the time that is not charged to any phase, e.g., gathering the pairs and recursion overhead
+                'phases': dict(self.phases, other=max(self.seconds - sum(self.phases.values()), 0))}
+
+class NullNodeProfile:
+    '''
+    A stand-in for NodeProfile when training is not profiled, which records nothing.
+    '''
+    __slots__ = ()
+
+    def lap(self, phase=None):
+        pass
+
+    def count(self, **counts):
+        pass
+
+    def finish(self):
+        pass
+
+NULL_NODE_PROFILE = NullNodeProfile()
+
+class TrainingProfile:
+    '''
+    An opt-in profile of ATP.train (see ATP.train's :profile: parameter): the time of each step of training,
+    and a NodeProfile for every node of the tree.
+    '''
+    def __init__(self):
+        self.steps = dict() # maps a step of training (e.g., 'build_tree') to its wall time
+        self.nodes = list() # NodeProfiles, in the order the nodes were started
+
+    def start_node(self, path, depth, num_pairs):
+        '''
+        :return: a new NodeProfile for a node that is about to be built
+        '''
+        node = NodeProfile(path, depth, num_pairs)
+        self.nodes.append(node)
+        return node
+
+    def time_step(self, step, start):
+        '''
+        Record that :step: of training ran from :start: (a time.perf_counter() time) until now.
+        '''
+        self.steps[step] = self.steps.get(step, 0) + time.perf_counter() - start
+
+    def phase_totals(self):
+        '''
+        :return: a dict mapping each phase (and 'other') to its total time over all the nodes
+        '''
+        totals = defaultdict(float)
+        for node in self.nodes:
+            for phase, seconds in node.to_dict()['phases'].items():
+                totals[phase] += seconds
+        return dict(totals)
+
+    def hot_nodes(self, k=10):
+        '''
+        :return: the :k: nodes that took the most time, slowest first
+        '''
+        return sorted(self.nodes, key=lambda node: node.seconds, reverse=True)[:k]
+
+    def to_dict(self):
+        return {'steps': dict(self.steps),
+                'phase_totals': self.phase_totals(),
+                'nodes': [node.to_dict() for node in self.nodes]}
+
+    def save(self, path):
+        '''
+        Save the profile to :path: as JSON.
+        '''
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
+
+    def summary(self, k=10):
+        '''
+        :return: a printable summary: the time of each step of training, the total time of each phase over all the nodes, and the :k: hottest nodes
+        '''
+        lines = ['step                         seconds']
+        for step, seconds in self.steps.items():
+            lines.append(f'{step:<28} {seconds:>8.3f}')
+        totals = self.phase_totals()
+        total = sum(totals.values())
+        lines.append('')
+        lines.append(f'phase (over {len(self.nodes)} nodes)       seconds        %')
+        for phase, seconds in sorted(totals.items(), key=lambda it: it[1], reverse=True):
+            lines.append(f'{phase:<28} {seconds:>8.3f} {100 * seconds / max(total, 1e-12):>7.1f}%')
+        lines.append('')
+        lines.append(f'hot nodes                      seconds    pairs   splits  phon.  {"slowest phase":<21}  path')
+        for node in self.hot_nodes(k):
+            phases = node.to_dict()['phases']
+            slowest = max(phases, key=phases.get)
+            lines.append(f'{"leaf" if node.leaf else "split":<5} at depth {node.depth:<15} {node.seconds:>8.3f} {node.num_pairs:>8} {node.num_split_options:>8} {node.num_phonological_conditions:>6}  {slowest:<21}  {node.path or "(root)"}')
+        return '\n'.join(lines)
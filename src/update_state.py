@@ -0,0 +1,106 @@
+from itertools import islice
+import numpy as np
+
+from pair_store import PairStore
+
+class UpdateState:
+    '''
+    What an updatable ATP model (see ATP's :updatable: parameter) keeps from training so that ATP.update can build on it:
+    the PairStore of every pair it has been trained on, and the TPSwitchStatement over all of them that labels the pairs (see ATP.build_labels).
+    '''
+    def __init__(self, store, switch_statement):
+        '''
+        :store: the PairStore of the training pairs and their labels
+        :switch_statement: the TPSwitchStatement trained on the training pairs, in order
+        '''
+        self.store = store
+        self.switch_statement = switch_statement
+
+    def add(self, pairs):
+        '''
+        Add :pairs: to the store, labeled as they would be by a switch statement trained on all of the pairs at once.
+        The label of an earlier pair can only change if its (lemma, features) is in more than one case (e.g., it was seen with two inflections),
+        since the order of the cases then decides it, so only those pairs are relabeled.
+
+        :return: an index array of the earlier pairs whose label changed
+        '''
+        tp = self.switch_statement
+        keys = set(tp.ambiguous)
+        keys.update(key for key in ((lemma, feats) for lemma, _, feats in pairs) if key in tp.lemma_index)
+        before = {key: tp.get_case(*key).label for key in keys}
+        tp.train(pairs) # training on the new pairs after the old ones is the same as training on all of them
+        relabeled = dict()
+        for key in keys:
+            label = tp.get_case(*key).label
+            if label != before[key]:
+                relabeled[key] = label
+        start = len(self.store)
+        get_case = tp.get_case
+        self.store.extend(pairs, np.fromiter((get_case(lemma, feats).label for lemma, _, feats in pairs), dtype=np.int64, count=len(pairs)))
+        if len(relabeled) == 0:
+            return np.zeros(0, dtype=np.int64)
+        indices = np.array([i for i, (lemma, _, feats) in enumerate(islice(self.store.pairs, start)) if (lemma, feats) in relabeled], dtype=np.int64)
+        self.store.relabel(indices, [relabeled[(lemma, feats)] for lemma, _, feats in self.store.pairs_of(indices)])
+        return indices
+
+class NodeState:
+    '''
+    What a node of an updatable model's tree keeps from being built, so that ATP.update can add new pairs to the node without recounting its old ones:
+    the pairs at the node, the split options it was built with, its EndingStatistics and TPSwitchStatement,
+    and, for each candidate split, the number of the node's pairs of each label that the split applies to (from which its consistency is scored).
+    '''
+    def __init__(self, path_string, split_options):
+        '''
+        :path_string: the path to the node
+        :split_options: the split options that the node is built with
+        '''
+        self.path_string = path_string
+        self.split_options = frozenset(split_options)
+        self.indices = np.zeros(0, dtype=np.int64) # the index array of the pairs at the node (in a PairStore), in order
+        self.ending_statistics = None
+        self.switch_statement = None
+        # if the node is a productive leaf, the position in its switch statement's cases that its default case was taken from
+        self.default_position = None
+        self.label_ids = np.zeros(0, dtype=np.int64) # the (sorted) ids of the labels of the node's pairs, which number the columns of the counts
+        self.label_counts = np.zeros(0, dtype=np.int64)
+        self.conditions = list() # the candidate splits, which number the rows of the counts
+        self.condition_rows = dict()
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+
+    def count(self, store, indices, conditions):
+        '''
+        Count, for each of :conditions:, the pairs at :indices: of each label that it applies to.
+        :indices: extends the index array last counted, and only the new pairs are counted for the conditions that were already counted.
+        '''
+        new = indices[len(self.indices):]
+        label_ids = np.union1d(self.label_ids, store.label_ids[new])
+        m = len(label_ids)
+        if m > len(self.label_ids): # add columns for the new labels
+            columns = np.searchsorted(label_ids, self.label_ids)
+            label_counts = np.zeros(m, dtype=np.int64)
+            label_counts[columns] = self.label_counts
+            counts = np.zeros((len(self.conditions), m), dtype=np.int64)
+            counts[:, columns] = self.counts
+            self.label_ids, self.label_counts, self.counts = label_ids, label_counts, counts
+        new_labels = np.searchsorted(label_ids, store.label_ids[new])
+        self.label_counts += np.bincount(new_labels, minlength=m)
+        kept = [condition for condition in self.conditions if condition in conditions]
+        added = [condition for condition in conditions if condition not in self.condition_rows]
+        kept_counts = self.counts[[self.condition_rows[condition] for condition in kept]] + store.applies_counts(kept, new, new_labels, m)
+        added_counts = store.applies_counts(added, indices, np.searchsorted(label_ids, store.label_ids[indices]), m) if len(added) > 0 else np.zeros((0, m), dtype=np.int64)
+        self.conditions = kept + added
+        self.condition_rows = {condition: i for i, condition in enumerate(self.conditions)}
+        self.counts = np.concatenate([kept_counts, added_counts])
+        self.indices = indices
+
+    def count_applies(self, conditions):
+        '''
+        :return: an array with the number of the node's pairs that each of :conditions: (which must have been counted) applies to
+        '''
+        return self.counts[[self.condition_rows[condition] for condition in conditions]].sum(axis=1)
+
+    def split_consistencies(self, conditions):
+        '''
+        :return: a (len(conditions), 2) array with the consistency of the node's pairs that each of :conditions: does and does not apply to, as from PairStore.split_consistencies
+        '''
+        return PairStore.consistencies(self.counts[[self.condition_rows[condition] for condition in conditions]], self.label_counts)
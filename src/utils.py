@@ -1,6 +1,10 @@
+import sys
+from sys import intern
 from collections import defaultdict
+from itertools import islice
 import numpy as np
-from scipy.spatial.distance import hamming
+
+from vocab import Vocab
 
 def tolerance_principle(n, c, xi=None, print_threshold=False):
     if xi == None:
@@ -18,16 +22,25 @@ def load_word_to_ipa():
             word_to_ipa[word] = ipa
     return word_to_ipa
 
+UMLAUTS = str.maketrans({'ä': 'a', 'ü': 'u', 'ö': 'o', 'Ä': 'A', 'Ü': 'U', 'Ö': 'O'})
+
 def remove_umlauts(s):
-    return s.replace(u'ä', 'a').replace(u'ü', 'u').replace(u'ö', 'o').replace(u'Ä', 'A').replace(u'Ü', 'U').replace(u'Ö', 'O')
+    return s if s.isascii() else s.translate(UMLAUTS) # only non-ASCII strings can contain umlauts
 
-def load_pairs(path, sep='\t', feat_sep=';', preprocessing=lambda s: remove_umlauts(s), skip_header=False, with_freq=False):
-    pairs = list()
-    feature_space = set()
-    freqs = list()
-    with open(path, 'r') as f:
+def iter_pairs(path, sep='\t', feat_sep=';', preprocessing=remove_umlauts, skip_header=False, with_freq=False):
+    '''
+    Lazily read the pairs of a file, one row at a time, so that files of any size can be streamed. See load_pairs for the parameters.
+    Lemmas and inflected forms are interned, and rows with the same features share a single feature tuple.
+
+    :path: a path to the file, or '-' to read from stdin
+
+    :return: a generator of (lemma, inflected, features) triples, or of (triple, frequency) tuples if :with_freq:
+    '''
+    bundles = dict() # maps the text of a feature column to its tuple of features
+    f = sys.stdin if path == '-' else open(path, 'r')
+    try:
         if skip_header:
-            next(f)
+            next(f, None)
         for line in f:
             line = line.strip().split(sep)
             if len(line) == 3:
@@ -40,15 +53,56 @@ def load_pairs(path, sep='\t', feat_sep=';', preprocessing=lambda s: remove_umla
                 freq = 0
             elif len(line) == 6:
                 _, lemma, _, inflected, feats, freq = line
-            lemma = preprocessing(lemma)
-            inflected = preprocessing(inflected)
-            pairs.append((lemma, inflected, tuple(feats.split(feat_sep))))
-            feature_space.update(feats.split(feat_sep))
-            freqs.append(float(freq))
+            bundle = bundles.get(feats)
+            if bundle is None:
+                bundle = bundles[feats] = tuple(feats.split(feat_sep))
+            pair = (intern(preprocessing(lemma)), intern(preprocessing(inflected)), bundle)
+            yield (pair, float(freq)) if with_freq else pair
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def load_pairs(path, sep='\t', feat_sep=';', preprocessing=remove_umlauts, skip_header=False, with_freq=False, columnar=False):
+    '''
+    Load the pairs of a file. See iter_pairs to stream them instead.
+
+    :columnar: if True, return the pairs as columns (lemmas, inflections, bundle_ids, bundles) instead of a list of triples:
+        lemmas and inflections are object arrays of the (interned) strings, bundle_ids is an int array with the id of each pair's feature tuple,
+        and bundles is the list of distinct feature tuples, so the features of pair i are bundles[bundle_ids[i]]
+
+    :return: a tuple (pairs, feature_space), with the frequencies of the pairs added at the end if :with_freq:
+    '''
+    lemmas, inflections, features = list(), list(), list()
+    freqs = list()
+    for (lemma, inflected, feats), freq in iter_pairs(path, sep=sep, feat_sep=feat_sep, preprocessing=preprocessing, skip_header=skip_header, with_freq=True):
+        lemmas.append(lemma)
+        inflections.append(inflected)
+        features.append(feats)
+        freqs.append(freq)
+    feature_space = set()
+    for feats in set(features): # features are shared between rows, so this is a small set
+        feature_space.update(feats)
+    if columnar:
+        bundles = Vocab()
+        bundle_ids = bundles.ids(features)
+        pairs = (np.array(lemmas, dtype=object), np.array(inflections, dtype=object), bundle_ids, bundles.items)
+    else:
+        pairs = list(zip(lemmas, inflections, features))
     if with_freq:
         return pairs, feature_space, freqs
     return pairs, feature_space
 
+def iter_batches(iterable, batch_size):
+    '''
+    :return: a generator of lists of up to :batch_size: consecutive items of :iterable:
+    '''
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if len(batch) == 0:
+            return
+        yield batch
+
 def load_german_CHILDES(with_feats=False):
     pairs = list()
     feature_space = set()
@@ -57,20 +111,65 @@ def load_german_CHILDES(with_feats=False):
             if line.startswith('singular\tplural'):
                 continue
             singular, plural, feats = line.strip().split('\t')
-            singular = singular.replace(u'ä', 'a').replace(u'ü', 'u').replace(u'ö', 'o').replace(u'Ä', 'A').replace(u'Ü', 'U').replace(u'Ö', 'O')
-            plural = plural.replace(u'ä', 'a').replace(u'ü', 'u').replace(u'ö', 'o').replace(u'Ä', 'A').replace(u'Ü', 'U').replace(u'Ö', 'O')
+            singular = remove_umlauts(singular)
+            plural = remove_umlauts(plural)
             feats = tuple(sorted(set(feats.split(',')).difference({'Mono-N', 'RFS', 'C'} if not with_feats else {'Mono-N', 'C'})))
             feature_space.update(feats)
             pairs.append((singular, plural, feats))
     return pairs, feature_space
 
 def hamming_distance(w1, w2):
-    w1, w2 = list(w1), list(w2)
-    while len(w1) > len(w2):
-        w2 = ['0'] + w2
-    while len(w1) < len(w2):
-        w1 = ['0'] + w1
-    return hamming(w1, w2)
+    '''
+    :return: the Hamming distance between :w1: and :w2:, right-aligned, with the shorter word left-padded with '0'.
+        The distance is normalized by the length of the longer word.
+    '''
+    n = max(len(w1), len(w2))
+    if n == 0:
+        return np.float64(np.nan)
+    w1, w2 = w1.rjust(n, '0'), w2.rjust(n, '0')
+    return np.float64(sum(c1 != c2 for c1, c2 in zip(w1, w2)) / n)
+
+def encode_words(words, width=None):
+    '''
+    Encode words for computing Hamming distances in batches (see hamming_distances).
+
+    :words: a list of words
+    :width: the width to pad the words to. By default, the length of the longest word.
+
+    :return: a tuple (codes, lengths), where codes is a (len(words), width) array of the words' character codes,
+        right-aligned and left-padded with '0' as in hamming_distance, and lengths is an array of the words' lengths
+    '''
+    lengths = np.fromiter((len(word) for word in words), dtype=np.int64, count=len(words))
+    if width is None:
+        width = int(lengths.max()) if len(words) > 0 else 0
+    padded = np.array([word.rjust(width, '0') for word in words], dtype=f'<U{max(width, 1)}')
+    codes = padded.view('<u4').reshape(len(words), max(width, 1))[:, :width]
+    return codes, lengths
+
+def hamming_distances(word, candidates, argmin=False):
+    '''
+    Compute the Hamming distance from :word: to many candidates in one pass. The distances are identical to those of hamming_distance.
+
+    :word: the query word
+    :candidates: a list of words, or a tuple (codes, lengths) of words already encoded by encode_words
+    :argmin: if True, return only the index of the nearest candidate, where ties go to the first of them (or None if there are no candidates)
+
+    :return: an array of the distance from :word: to each candidate, or the index of the nearest candidate if :argmin:
+    '''
+    codes, lengths = candidates if type(candidates) is tuple else encode_words(candidates)
+    if argmin and len(lengths) == 0:
+        return None
+    width = codes.shape[1]
+    extra = max(len(word) - width, 0)
+    query, _ = encode_words([word], width + extra)
+    query = query[0]
+    # the characters of a long query that fall beyond the candidates' width are compared against padding
+    mismatches = (codes != query[extra:]).sum(axis=1) + int((query[:extra] != ord('0')).sum())
+    with np.errstate(invalid='ignore'):
+        distances = mismatches / np.maximum(lengths, len(word))
+    if argmin:
+        return int(np.argmin(distances))
+    return distances
 
 def most_freq(l):
     item_to_count = defaultdict(int)
@@ -0,0 +1,50 @@
+import numpy as np
+
+class Vocab:
+    '''
+    A vocabulary that maps hashable items (labels, feature tuples, suffixes, ...) to small consecutive int ids, in order of first occurrence.
+    Each item is hashed once, when it is mapped; everything downstream can then work on compact int arrays (e.g., counting with np.bincount).
+    '''
+    def __init__(self, items=()):
+        '''
+        :items: an iterable of items to add to the vocabulary
+        '''
+        self.item_to_id = dict()
+        self.items = list() # the item of each id
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.item_to_id
+
+    def __getitem__(self, i):
+        '''
+        :return: the item with id :i:
+        '''
+        return self.items[i]
+
+    def add(self, item):
+        '''
+        :return: the id of :item:, adding it to the vocabulary if it is new
+        '''
+        i = self.item_to_id.get(item)
+        if i is None:
+            i = self.item_to_id[item] = len(self.items)
+            self.items.append(item)
+        return i
+
+    def get(self, item, default=None):
+        '''
+        :return: the id of :item:, or :default: if it is not in the vocabulary
+        '''
+        return self.item_to_id.get(item, default)
+
+    def ids(self, items):
+        '''
+        :return: an int array of the id of each of :items:, adding any new items to the vocabulary
+        '''
+        add = self.add
+        return np.fromiter((add(item) for item in items), dtype=np.int64, count=len(items))
@@ -0,0 +1,201 @@
+import os
+import sys
+import json
+import time
+import glob
+import random
+import argparse
+import platform
+import tracemalloc
+import numpy as np
+sys.path.append('../src/')
+from atp import ATP
+from utils import load_pairs
+
+'''
+A benchmark suite for training and inference, over synthetic lexicons of increasing size and over the German data.
+Unlike the test cases, it is not run by tester.py. Run it from this directory, e.g.,
+
+    python benchmark.py --save ../temp/benchmark.json
+    python benchmark.py --baseline ../temp/benchmark.json
+    python benchmark.py --sizes 1000 10000 100000 1000000 --no_memory # a million pairs takes minutes to train
+
+Each result is a row {'dataset', 'size', 'metric', 'value'}, and a run can be compared against a saved baseline run,
+which reports the metrics that got worse by more than --tolerance (and exits with status 1 if any did).
+'''
+
+ALPHABET = 'abcdefghiklmnoprstuz'
+VOWELS = 'aeiou'
+# metrics where higher is better; for every other metric, lower is better
+HIGHER_IS_BETTER = {'inflect_per_second', 'inflect_no_feat_per_second'}
+
+def synthetic_lexicon(num_lemmas, num_suffix_classes=5, irregular_rate=0.05, num_features=3, ending_length=1, seed=0):
+    '''
+    Generate a synthetic lexicon of (lemma, inflected, features) pairs, where the suffix a lemma takes is decided by its feature and its ending.
+    The lemmas with the last feature (if there is more than one) take suffixes at random, so they have no productive process and their inflections are guessed.
+
+    :num_lemmas: the number of (distinct) lemmas
+    :num_suffix_classes: the number of distinct suffixes (one of which is the empty suffix)
+    :irregular_rate: the fraction of lemmas that are inflected irregularly (with a stem change instead of their class's suffix)
+    :num_features: the number of semantic features (e.g., genders), one of which each lemma has
+    :ending_length: the length of the lemma endings that, together with the feature, decide the suffix
+    :seed: the random seed
+
+    :return: a tuple (pairs, feature_space)
+    '''
+    rng = random.Random(seed)
+    suffixes = [''] + [''.join(rng.choice(ALPHABET) for _ in range(1 + i % 2)) for i in range(num_suffix_classes - 1)]
+    features = [f'F{i}' for i in range(num_features)]
+    # each feature has a default suffix, which the lemmas with some endings override with another suffix
+    regular_features = features[:-1] if num_features > 1 else features
+    defaults = {feature: rng.choice(suffixes) for feature in regular_features}
+    overrides = dict()
+    for feature in regular_features:
+        for suffix in suffixes:
+            if suffix != defaults[feature]:
+                overrides[(feature, ''.join(rng.choice(ALPHABET) for _ in range(ending_length)))] = suffix
+    lemmas = set()
+    pairs = list()
+    while len(pairs) < num_lemmas:
+        lemma = ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(max(ending_length, 3), 9)))
+        if lemma in lemmas:
+            continue
+        lemmas.add(lemma)
+        feature = rng.choice(features)
+        if rng.random() < irregular_rate:
+            inflected = f'{lemma[:-1]}{rng.choice(VOWELS)}{lemma[-1]}'
+        else:
+            suffix = overrides.get((feature, lemma[-ending_length:]), defaults[feature]) if feature in defaults else rng.choice(suffixes)
+            inflected = f'{lemma}{suffix}'
+        pairs.append((lemma, inflected, (feature,)))
+    return pairs, set(features)
+
+def german_lexicon():
+    '''
+    :return: a tuple (pairs, feature_space) of every distinct pair in the German data (see data/german.zip)
+    '''
+    pairs = set()
+    for path in glob.glob('../data/german/*/*.txt'):
+        pairs.update(load_pairs(path)[0])
+    return sorted(pairs), {'N', 'M', 'F'}
+
+def benchmark(pairs, feature_space, queries, measure_memory=True, num_guesses=200):
+    '''
+    Measure training and inference on a lexicon.
+
+    :pairs: the training pairs
+    :queries: (lemma, inflected, features) pairs to inflect, mostly unseen in training
+    :measure_memory: if True, train a second time under tracemalloc to measure peak memory (which slows training down, so it is not timed)
+    :num_guesses: the maximum number of guesses to time
+
+    :return: a dict mapping each metric to its value
+    '''
+    res = dict()
+    start = time.perf_counter()
+    atp = ATP(feature_space=feature_space).train(pairs)
+    res['train_seconds'] = time.perf_counter() - start
+    res['num_leaves'] = len(atp.get_leaves())
+    if measure_memory:
+        tracemalloc.start()
+        ATP(feature_space=feature_space).train(pairs)
+        res['train_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    start = time.perf_counter()
+    guesses = [lemma for lemma, _, feats in queries if atp.inflect(lemma, feats, return_whether_guess=True)[1]]
+    res['inflect_per_second'] = len(queries) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for lemma, _, feats in queries:
+        atp.inflect_no_feat(lemma, feats)
+    res['inflect_no_feat_per_second'] = len(queries) / (time.perf_counter() - start)
+
+    # the latency of inflections that take the guess path, for lemmas that are guessed
+    latencies = list()
+    for lemma, _, feats in queries:
+        if len(latencies) == min(num_guesses, len(guesses)):
+            break
+        node = atp.probe(lemma, feats)
+        start = time.perf_counter()
+        pred = node.switch_statement.inflect_known(lemma, feats)
+        if pred is None:
+            atp.guess_inflection(lemma, node)
+            latencies.append(time.perf_counter() - start)
+    res['guess_rate'] = len(guesses) / len(queries)
+    if len(latencies) > 0:
+        res['guess_p50_seconds'] = float(np.percentile(latencies, 50))
+        res['guess_p95_seconds'] = float(np.percentile(latencies, 95))
+    return res
+
+def run(sizes, num_queries=10000, measure_memory=True, german=True, seed=0, **lexicon_args):
+    '''
+    :return: a list of result rows, for synthetic lexicons of each of :sizes: (and the German data, if :german:)
+    '''
+    rows = list()
+    def add(dataset, size, res):
+        for metric, value in res.items():
+            rows.append({'dataset': dataset, 'size': size, 'metric': metric, 'value': value})
+            print(f'{dataset:<10} {size:>8} {metric:<28} {value:.6g}', file=sys.stderr)
+    for size in sizes:
+        pairs, feature_space = synthetic_lexicon(size + num_queries, seed=seed, **lexicon_args)
+        # the queries are lemmas from the same lexicon that are held out of training
+        add('synthetic', size, benchmark(pairs[:size], feature_space, pairs[size:], measure_memory=measure_memory))
+    if german:
+        pairs, feature_space = german_lexicon()
+        random.Random(seed).shuffle(pairs)
+        n = len(pairs) * 4 // 5
+        add('german', n, benchmark(pairs[:n], feature_space, pairs[n:], measure_memory=measure_memory))
+    return rows
+
+def compare(rows, baseline, tolerance):
+    '''
+    :return: a list of (dataset, size, metric, baseline value, value) of the metrics in :rows: that are worse than in :baseline: by more than a fraction :tolerance:
+    '''
+    baseline_values = {(row['dataset'], row['size'], row['metric']): row['value'] for row in baseline}
+    regressions = list()
+    for row in rows:
+        key = (row['dataset'], row['size'], row['metric'])
+        if key not in baseline_values or row['metric'] in {'num_leaves', 'guess_rate'}: # these describe the lexicon, not performance
+            continue
+        old, new = baseline_values[key], row['value']
+        worse = new < old * (1 - tolerance) if row['metric'] in HIGHER_IS_BETTER else new > old * (1 + tolerance)
+        if worse:
+            regressions.append((*key, old, new))
+    return regressions
+
+def main(args):
+    rows = run(args.sizes, num_queries=args.num_queries, measure_memory=not args.no_memory, german=not args.no_german, seed=args.seed,
+               num_suffix_classes=args.num_suffix_classes, irregular_rate=args.irregular_rate, num_features=args.num_features, ending_length=args.ending_length)
+    results = {'environment': {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(), 'cpus': os.cpu_count()},
+               'results': rows}
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1)
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(rows, baseline, args.tolerance)
+        for dataset, size, metric, old, new in regressions:
+            print(f'REGRESSION {dataset} {size} {metric}: {old:.6g} -> {new:.6g}')
+        if len(regressions) > 0:
+            sys.exit(1)
+        print(f'No regressions beyond {args.tolerance:.0%} against {args.baseline}')
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help="The numbers of training pairs of the synthetic lexicons.")
+    parser.add_argument('--num_queries', type=int, default=10000, help="The number of held-out lemmas to inflect.")
+    parser.add_argument('--num_suffix_classes', type=int, default=5, help="The number of suffixes of the synthetic lexicons.")
+    parser.add_argument('--irregular_rate', type=float, default=0.05, help="The fraction of irregular lemmas of the synthetic lexicons.")
+    parser.add_argument('--num_features', type=int, default=3, help="The number of semantic features of the synthetic lexicons.")
+    parser.add_argument('--ending_length', type=int, default=1, help="The length of the endings that decide suffixes in the synthetic lexicons.")
+    parser.add_argument('--seed', type=int, default=0, help="The random seed.")
+    parser.add_argument('--no_memory', action='store_true', help="Skip measuring peak training memory (which trains every lexicon a second time).")
+    parser.add_argument('--no_german', action='store_true', help="Skip the German data.")
+    parser.add_argument('--save', type=str, default=None, help="A path to save the results to as JSON.")
+    parser.add_argument('--baseline', type=str, default=None, help="A path to results saved by --save to compare against.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="The fraction by which a metric may get worse than the baseline before it is reported.")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    main(args)
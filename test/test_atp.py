@@ -1,11 +1,12 @@
 import unittest
 import numpy as np
 import glob
+import random
 
 import sys
 sys.path.append('../src/')
 from atp import ATP
-from utils import load_pairs, load_word_to_ipa
+from utils import load_pairs, load_word_to_ipa, iter_pairs
 
 class TestATP(unittest.TestCase):
     def test_init(self):
@@ -31,6 +32,12 @@ class TestATP(unittest.TestCase):
         c2 = sorted(vals_splits[split_feature.name]) == sorted([p1, p2, p3, p6]) and sorted(vals_splits[f'¬{split_feature.name}']) == sorted([p4, p5])
         assert(c1 or c2)
 
+    def test_consistency_1(self):
+        tp = ATP(feature_space={'PST'})
+        assert(tp.consistency(np.array([0, 0, 1, 0])) == 3 / 4)
+        assert(tp.consistency(np.array([2])) == 1)
+        assert(tp.consistency(np.array([], dtype=np.int64)) == 0)
+
     def _evaluate(self, lang, test_path, tp, no_feats):
         c = 0
         t = 0
@@ -305,6 +312,185 @@ class TestATP(unittest.TestCase):
                 c += 1
             t += 1
         assert(c / t == 1.0)
-        
+
+    def test_train_parallel_1(self):
+        from utils import load_german_CHILDES
+        pairs, features = load_german_CHILDES()
+        serial = ATP(feature_space=features).train(pairs)
+        for parallel_depth in [1, 3]:
+            parallel = ATP(feature_space=features).train(pairs, n_jobs=3, parallel_depth=parallel_depth)
+            assert(sorted(leaf.name for leaf in parallel.get_leaves()) == sorted(leaf.name for leaf in serial.get_leaves()))
+            for lemma, inflected, feats in pairs:
+                assert(parallel.inflect(lemma, feats) == inflected)
+
+    def test_train_parallel_2(self):
+        def signature(node):
+            if node.num_children() == 0:
+                return (node.name, node.switch_statement.default_case.name, [(case.name, sorted(case.lemmas)) for case in node.switch_statement.cases])
+            return (node.name, [(pos, condition.name, signature(child)) for (pos, condition), child in node.get_children()])
+
+        for size in [60, 360]:
+            for seed in range(5):
+                pairs, feature_space = load_pairs(f'../data/german/quant/train{size}_{seed}.txt')
+                serial = ATP(feature_space=feature_space).train(pairs)
+                parallel = ATP(feature_space=feature_space).train(pairs, n_jobs=2, parallel_depth=1)
+                assert(signature(serial.root) == signature(parallel.root))
+
+    def test_update_1(self):
+        def signature(node):
+            if node.num_children() == 0:
+                return (node.name, node.switch_statement.default_case.name, [(case.name, sorted(case.lemmas)) for case in node.switch_statement.cases])
+            return (node.name, [(pos, condition.name, signature(child)) for (pos, condition), child in node.get_children()])
+
+        for seed in [0, 7]:
+            # each growth snapshot is a superset of the previous one
+            atp, seen = None, list()
+            for size in [100, 200, 300, 400]:
+                pairs, feature_space = load_pairs(f'../data/german/growth/train{size}_{seed}.txt')
+                new_pairs = [pair for pair in pairs if pair not in set(seen)]
+                seen += new_pairs
+                atp = ATP(feature_space=feature_space, updatable=True).train(new_pairs) if atp is None else atp.update(new_pairs)
+                retrained = ATP(feature_space=feature_space).train(seen)
+                assert(signature(atp.root) == signature(retrained.root))
+                assert(atp.get_leaves()[0].rank is not None) # the updated tree is summarized for inflect_no_feat
+
+    def test_update_2(self):
+        pairs, feature_space = load_pairs('../data/german/quant/train360_0.txt')
+        atp = ATP(feature_space=feature_space, updatable=True).train(pairs[:300])
+        leaves = atp.get_leaves()
+        atp.update(pairs[300:301])
+        kept = [leaf for leaf in atp.get_leaves() if any(leaf is old for old in leaves)]
+        assert(len(kept) > 0) # subtrees that the new pair does not reach are not rebuilt
+        assert(atp.update([]).get_leaves() == atp.get_leaves())
+        assert(len(atp.update_state.store) == 301)
+        # only updatable models keep what update needs
+        atp = ATP(feature_space=feature_space).train(pairs)
+        assert(atp.update_state is None and all(leaf.state is None for leaf in atp.get_leaves()))
+        with self.assertRaises(AssertionError):
+            atp.update(pairs[:1])
+
+    def test_update_3(self):
+        def signature(node):
+            if node.num_children() == 0:
+                return (node.name, node.switch_statement.default_case.name, [(case.name, sorted(case.lemmas)) for case in node.switch_statement.cases])
+            return (node.name, [(pos, condition.name, signature(child)) for (pos, condition), child in node.get_children()])
+
+        pairs, feature_space = load_pairs('../data/german/quant/train360_0.txt')
+        rng = random.Random(0)
+        # lemmas seen again with another inflection, whose label depends on the order of the cases of the switch statement that labels the pairs
+        pairs += [(lemma, f'{lemma}{rng.choice(["n", "e", "s"])}', feats) for lemma, _, feats in rng.sample(pairs, 60)]
+        rng.shuffle(pairs)
+        assert(signature(ATP(feature_space=feature_space, updatable=True).train(pairs).root) == signature(ATP(feature_space=feature_space).train(pairs).root))
+        atp, start = ATP(feature_space=feature_space, updatable=True).train(pairs[:50]), 50
+        while start < len(pairs):
+            end = start + rng.choice([1, 5, 40])
+            atp.update(pairs[start:end])
+            start = end
+            assert(signature(atp.root) == signature(ATP(feature_space=feature_space).train(pairs[:end]).root))
+
+    def test_best_split_1(self):
+        from pair_store import PairStore
+        tp = ATP(feature_space={'A', 'B', 'C'})
+        # every split is equally good, so the tie is broken in favor of the first option in sorted order
+        _pairs = [('x', 'xa', ('A', 'B', 'C')), ('y', 'yb', ())]
+        store = PairStore(_pairs, np.array([0, 1]))
+        for _ in range(5):
+            split_feature, mask = tp.best_split(store, store.all_indices(), set(tp.feature_space))
+            assert(split_feature.name == 'A')
+            assert(list(mask) == [True, False])
+
+    def test_inflect_many_1(self):
+        for seed in range(5):
+            fname = f'../data/german/quant/train120_{seed}.txt'
+            pairs, feature_space = load_pairs(fname)
+            test_pairs, _ = load_pairs(fname.replace('train120', 'test'))
+            tp = ATP(feature_space=feature_space).train(pairs)
+            lemmas = [lemma for lemma, _, _ in test_pairs]
+            features = [feats for _, _, feats in test_pairs]
+            preds, guesses = tp.inflect_many(lemmas, features)
+            assert(len(preds) == len(guesses) == len(test_pairs))
+            for i, (lemma, feats) in enumerate(zip(lemmas, features)):
+                assert((preds[i], guesses[i]) == tp.inflect(lemma, feats, return_whether_guess=True))
+
+    def test_inflect_many_2(self):
+        tp = ATP(feature_space={'Noun', 'Verb'})
+        tp.train([('a', 'a-', ('Noun',)), ('b', 'b-', ('Noun',)), ('c', 'c-', ('Noun',)), ('d', 'd*', ('Noun',)),
+                  ('a', 'a+', ('Verb',)), ('b', 'b+', ('Verb',)), ('c', 'c+', ('Verb',)), ('d', 'd**', ('Verb',))])
+        assert(tp.inflect_many([], []) == ([], []))
+        preds, guesses = tp.inflect_many(['e', 'd', 'e', 'd'], [('Noun',), ('Noun',), ('Verb',), ('Verb',)])
+        assert(preds == ['e-', 'd*', 'e+', 'd**'])
+        assert(guesses == [False, False, False, False])
+
+    def test_accuracy_1(self):
+        pairs, feature_space = load_pairs('../data/german/quant/train120_0.txt')
+        test_pairs, _ = load_pairs('../data/german/quant/test_0.txt')
+        tp = ATP(feature_space=feature_space).train(pairs)
+        acc = tp.accuracy(test_pairs)
+        assert(acc == sum(tp.inflect(lemma, feats) == inflected for lemma, inflected, feats in test_pairs) / len(test_pairs))
+        # pairs that can only be iterated once give the same accuracy
+        assert(tp.accuracy(pair for pair in test_pairs) == acc)
+        assert(tp.accuracy(iter_pairs('../data/german/quant/test_0.txt')) == acc)
+        assert(tp.accuracy(iter(())) == 0)
+
+    def test_cache_1(self):
+        pairs, feature_space = load_pairs('../data/german/quant/train60_0.txt')
+        test_pairs, _ = load_pairs('../data/german/quant/test_0.txt')
+        queries = sorted(set((lemma, feats) for lemma, _, feats in test_pairs))[:20]
+        uncached = ATP(feature_space=feature_space).train(pairs)
+        atp = ATP(feature_space=feature_space, cache_size=50).train(pairs)
+        for _ in range(2):
+            for lemma, feats in queries:
+                assert(atp.inflect(lemma, feats, return_whether_guess=True) == uncached.inflect(lemma, feats, return_whether_guess=True))
+                assert(atp.inflect_no_feat(lemma, feats) == uncached.inflect_no_feat(lemma, feats))
+        assert(len(atp.cache) == 40) # each query is cached once for each entry point
+        assert(atp.cache.misses == 40)
+        assert(atp.cache.hits == 40)
+        atp.train(pairs[:30]) # retraining invalidates the cache
+        assert(len(atp.cache) == 0)
+        assert(ATP(feature_space=feature_space).cache is None)
+
+    def test_inflect_no_feat_1(self):
+        def reference(atp, lemma):
+            # collect every compatible leaf, then take the deepest productive one (or the deepest, if none is productive)
+            leaves = list()
+            frontier = [atp.root]
+            while len(frontier) != 0:
+                node = frontier.pop()
+                if node.num_children() == 0:
+                    leaves.append(node)
+                for (pos, condition), child in node.get_children():
+                    if condition.condition_type == 'Semantic' or pos == condition.applies(lemma, ()):
+                        frontier.append(child)
+            productive = [leaf for leaf in leaves if not leaf.name.endswith('No Productive Process')]
+            return sorted(productive or leaves, reverse=True, key=lambda it: (it.name.count(','), len(it.switch_statement.vocab)))[0]
+        for seed in range(3):
+            fname = f'../data/german/quant/train120_{seed}.txt'
+            pairs, feature_space = load_pairs(fname)
+            test_pairs, _ = load_pairs(fname.replace('train120', 'test'))
+            atp = ATP(feature_space=feature_space).train(pairs)
+            for leaf in atp.get_leaves():
+                assert(leaf.productive == (not leaf.name.endswith('No Productive Process')))
+                assert(leaf.depth == leaf.name.count(',') + 1)
+            for lemma, _, _ in pairs + test_pairs:
+                leaf = reference(atp, lemma)
+                assert(atp.inflect_no_feat(lemma, (), return_whether_guess=True) == atp.inflect_at_leaf(lemma, (), leaf))
+
+    def test_inflect_stream_1(self):
+        pairs, feature_space = load_pairs('../data/german/quant/train60_0.txt')
+        test_pairs, _ = load_pairs('../data/german/quant/test_0.txt')
+        atp = ATP(feature_space=feature_space).train(pairs)
+        preds, _ = atp.inflect_many([lemma for lemma, _, _ in test_pairs], [feats for _, _, feats in test_pairs])
+        batches = list(atp.inflect_stream(iter(test_pairs), batch_size=30))
+        assert([len(batch) for batch in batches] == [30, 30, len(test_pairs) - 60])
+        assert(sum(batches, []) == preds)
+        assert(list(atp.inflect_stream([])) == [])
+
+    def test_inflect_stream_2(self):
+        pairs, feature_space = load_pairs('../data/german/quant/train60_0.txt')
+        test_pairs, _ = load_pairs('../data/german/quant/test_0.txt')
+        atp = ATP(feature_space=feature_space).train(pairs)
+        serial = list(atp.inflect_stream(test_pairs, batch_size=7))
+        assert(list(atp.inflect_stream(iter(test_pairs), batch_size=7, n_jobs=3)) == serial) # in input order
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,46 @@
+import unittest
+
+import sys
+sys.path.append('../src/')
+from atp import ATP
+from utils import load_pairs, load_german_CHILDES
+
+class TestCompiledATP(unittest.TestCase):
+    def test_compile_1(self):
+        pairs = [('a', 'a-', ('Noun',)),
+                 ('b', 'b-', ('Noun',)),
+                 ('c', 'c-', ('Noun',)),
+                 ('d', 'd*', ('Noun',)),
+                 ('a', 'a+', ('Verb',)),
+                 ('b', 'b+', ('Verb',)),
+                 ('c', 'c+', ('Verb',)),
+                 ('d', 'd**', ('Verb',))]
+        atp = ATP(feature_space={'Noun', 'Verb'}).train(pairs)
+        compiled = atp.compile()
+        assert(compiled.num_nodes() == 3)
+        assert(compiled.inflect('e', ('Noun',)) == 'e-')
+        assert(compiled.inflect('e', ('Verb',)) == 'e+')
+        assert(compiled.inflect('d', ('Noun',)) == 'd*')
+        assert(compiled.inflect('d', ('Verb',), return_whether_guess=True) == ('d**', False))
+
+    def test_compile_2(self):
+        pairs, features = load_german_CHILDES()
+        atp = ATP(feature_space=features).train(pairs)
+        compiled = atp.compile()
+        assert(compiled.num_nodes() == 2 * len(atp.get_leaves()) - 1)
+        assert(set(compiled.leaf_names) == set(leaf.name for leaf in atp.get_leaves()))
+        for lemma, _, feats in pairs:
+            assert(compiled.leaf_names[compiled.probe_leaf(lemma, feats)] == atp.probe(lemma, feats).name)
+
+    def test_inflect_1(self):
+        for seed in range(5):
+            fname = f'../data/german/quant/train60_{seed}.txt'
+            pairs, feature_space = load_pairs(fname)
+            test_pairs, _ = load_pairs(fname.replace('train60', 'test'))
+            atp = ATP(feature_space=feature_space).train(pairs)
+            compiled = atp.compile()
+            for lemma, _, feats in pairs + test_pairs:
+                assert(compiled.inflect(lemma, feats, return_whether_guess=True) == atp.inflect(lemma, feats, return_whether_guess=True))
+
+if __name__ == "__main__":
+    unittest.main()
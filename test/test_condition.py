@@ -0,0 +1,34 @@
+import unittest
+import pickle
+import sys
+sys.path.append('../src/')
+from semantic_condition import SemanticCondition
+from phonological_condition import PhonologicalCondition
+
+class TestCondition(unittest.TestCase):
+    def test_intern_1(self):
+        assert(SemanticCondition('M') is SemanticCondition('M'))
+        assert(PhonologicalCondition('el') is PhonologicalCondition('el'))
+        assert(PhonologicalCondition(('g', 'r', 't')) is PhonologicalCondition(('g', 'r', 't')))
+        assert(SemanticCondition('M') is not SemanticCondition('F'))
+        assert(PhonologicalCondition('el') is not PhonologicalCondition(('el', 'e')))
+
+    def test_eq_1(self):
+        assert(len({SemanticCondition('M'), SemanticCondition('M'), PhonologicalCondition('M'), PhonologicalCondition('e')}) == 3)
+        assert(SemanticCondition('e#') != PhonologicalCondition('e'))
+
+    def test_sort_1(self):
+        conditions = [SemanticCondition('M'), PhonologicalCondition('e'), SemanticCondition('F'), PhonologicalCondition(('d', 'h'))]
+        assert([c.name for c in sorted(conditions)] == ['[d|h]#', 'e#', 'F', 'M'])
+        assert(sorted(conditions) == sorted(reversed(conditions)))
+
+    def test_pickle_1(self):
+        conditions = [SemanticCondition('M'), PhonologicalCondition('e'), PhonologicalCondition(('d', 'h'))]
+        for condition in conditions:
+            assert(pickle.loads(pickle.dumps(condition)) is condition)
+        condition = pickle.loads(pickle.dumps(PhonologicalCondition(('x', 'yz'))))
+        assert(condition.name == '[x|yz]#')
+        assert(condition.applies('ayz', ()))
+
+if __name__ == "__main__":
+    unittest.main()
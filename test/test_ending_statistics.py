@@ -0,0 +1,61 @@
+import unittest
+import sys
+sys.path.append('../src/')
+from ending_statistics import EndingStatistics
+from utils import load_pairs
+
+class TestEndingStatistics(unittest.TestCase):
+    def test_init(self):
+        stats = EndingStatistics()
+        assert(len(stats.ending_counts) == 0)
+
+    def test_count_1(self):
+        pairs = [('Sache', 'Sachen', ('F',)),
+                 ('Sache', 'Sachen', ('F',)), # duplicates are counted once
+                 ('Nadel', 'Nadeln', ('F',)),
+                 ('Tag', 'Tage', ('M',)),
+                 ('Mutter', 'Mutter', ('F',)),
+                 ('Haus', 'Hauser', ('N',))]
+        stats = EndingStatistics(pairs)
+        assert(stats.ending_counts['e'] == 1)
+        assert(stats.ending_counts['el'] == 1)
+        assert(stats.ending_counts['er'] == 1)
+        assert('Tag' not in stats.ending_counts) # endings must be shorter than the lemma
+        assert(stats.ending_suffix_counts[('e', 'n')] == 1)
+        assert(stats.suffix_counts['n'] == 2)
+        assert(stats.suffix_order == ['n', 'e', '', 'er'])
+        assert(stats.suffixes() == ['n', 'e', '', 'er'])
+        assert(stats.endings()[:3] == ['e', 'g', 'l'])
+
+    def test_split_1(self):
+        pairs, _ = load_pairs('../data/german/quant/train360_0.txt')
+        stats = EndingStatistics(pairs)
+        for condition in [lambda lemma, feats: 'F' in feats,
+                          lambda lemma, feats: lemma.endswith('e'),
+                          lambda lemma, feats: 'M' not in feats]:
+            X = [pair for pair in pairs if condition(pair[0], pair[2])]
+            Y = [pair for pair in pairs if not condition(pair[0], pair[2])]
+            for derived, counted in zip(stats.split(X, Y), [EndingStatistics(X), EndingStatistics(Y)]):
+                assert(derived.ending_counts == counted.ending_counts)
+                assert(derived.ending_suffix_counts == counted.ending_suffix_counts)
+                assert(derived.suffix_counts == counted.suffix_counts)
+                assert(derived.suffixes() == counted.suffixes())
+                assert(derived.endings() == counted.endings())
+
+    def test_count_2(self):
+        pairs, _ = load_pairs('../data/german/quant/train360_0.txt')
+        stats = EndingStatistics(pairs[:100])
+        stats.passing_endings() # from here on, the passing suffixes are updated as pairs are added
+        seen = 100
+        for start, end in [(100, 101), (101, 200), (150, 360)]: # the last batch overlaps the pairs already counted
+            stats.count(pairs[start:end], known=set(pairs[:seen]))
+            seen = end
+            counted = EndingStatistics(pairs[:end])
+            assert(stats.ending_counts == counted.ending_counts)
+            assert(stats.ending_suffix_counts == counted.ending_suffix_counts)
+            assert(stats.suffixes() == counted.suffixes())
+            assert(stats.passing_endings() == counted.passing_endings())
+        assert(len(stats.passing_endings()) > 0)
+
+if __name__ == "__main__":
+    unittest.main()
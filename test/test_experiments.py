@@ -0,0 +1,75 @@
+import unittest
+import os
+import csv
+import tempfile
+
+import sys
+sys.path.append('../src/')
+from atp import ATP
+from experiments import expand_grid, run_grid, productive_suffixes
+
+class TestExperiments(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'results.csv')
+        self.spec = {'train': '../data/german/quant/train{size}_{seed}.txt',
+                     'test': '../data/german/quant/test_{seed}.txt',
+                     'size': [60, 120],
+                     'seed': '0:3'}
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def read_rows(self, path):
+        with open(path, 'r', newline='') as f:
+            rows = list(csv.DictReader(f))
+        for row in rows:
+            del row['train_seconds'] # the only column that varies between runs
+        return sorted(rows, key=lambda row: (int(row['size']), int(row['seed'])))
+
+    def test_expand_grid_1(self):
+        axes, jobs = expand_grid(self.spec)
+        assert(axes == ['size', 'seed'])
+        assert(jobs == [{'size': size, 'seed': seed} for size in [60, 120] for seed in [0, 1, 2]])
+        _, jobs = expand_grid({'train': '{size}.txt', 'size': '50:1050:50'})
+        assert([job['size'] for job in jobs] == list(range(50, 1050, 50)))
+
+    def test_productive_suffixes_1(self):
+        pairs = [('a', 'a-', ('Noun',)),
+                 ('b', 'b-', ('Noun',)),
+                 ('c', 'c-', ('Noun',)),
+                 ('d', 'd*', ('Noun',)),
+                 ('a', 'a', ('Verb',)),
+                 ('b', 'b', ('Verb',)),
+                 ('c', 'c', ('Verb',)),
+                 ('d', 'd**', ('Verb',))]
+        atp = ATP(feature_space={'Noun', 'Verb'}).train(pairs)
+        assert(productive_suffixes(atp) == ['--', '-∅'])
+
+    def test_run_grid_1(self):
+        assert(run_grid(self.spec, self.path) == 6)
+        rows = self.read_rows(self.path)
+        assert(len(rows) == 6)
+        assert(rows[0]['size'] == '60' and rows[0]['seed'] == '0' and rows[0]['num_pairs'] == '60')
+        assert(all(0 <= float(row['test_accuracy']) <= 1 for row in rows))
+        assert(run_grid(self.spec, self.path) == 0) # every job is done
+        # resume after an interruption that cut off the last row
+        with open(self.path, 'rb+') as f:
+            f.truncate(os.path.getsize(self.path) - 10)
+        assert(run_grid(self.spec, self.path) == 1)
+        assert(self.read_rows(self.path) == rows)
+        # resume after interruptions that cut off only the last row's line break, or also one character of its last field
+        for cut in [1, 2, 3]:
+            with open(self.path, 'rb+') as f:
+                f.truncate(os.path.getsize(self.path) - cut)
+            assert(run_grid(self.spec, self.path) == 1)
+            assert(self.read_rows(self.path) == rows)
+
+    def test_run_grid_2(self):
+        run_grid(self.spec, self.path)
+        parallel_path = os.path.join(self.dir.name, 'parallel.csv')
+        assert(run_grid(self.spec, parallel_path, n_jobs=3) == 6)
+        assert(self.read_rows(parallel_path) == self.read_rows(self.path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+import pickle
+from collections import Counter
+
+import sys
+sys.path.append('../src/')
+from atp import ATP
+from inference_metrics import InferenceMetrics, LatencyHistogram, LATENCY_BUCKETS, MEMORIZED, PRODUCTIVE, GUESSED
+from utils import load_pairs
+
+class TestInferenceMetrics(unittest.TestCase):
+    def setUp(self):
+        self.pairs, self.feature_space = load_pairs('../data/german/quant/train360_0.txt')
+        self.test_pairs, _ = load_pairs('../data/german/quant/test_0.txt')
+
+    def test_latency_histogram_1(self):
+        histogram = LatencyHistogram()
+        assert(histogram.percentile(50) is None)
+        for _ in range(98):
+            histogram.observe(1e-5)
+        histogram.observe(1e-3)
+        histogram.observe(1e3) # beyond the largest bucket
+        assert(histogram.count == 100)
+        assert(histogram.percentile(50) == LATENCY_BUCKETS[10]) # the bucket bounded by 1e-5
+        assert(histogram.percentile(99) >= 1e-3)
+        assert(histogram.percentile(100) == float('inf'))
+        other = LatencyHistogram()
+        other.observe(1e-5)
+        histogram.merge(other)
+        assert(histogram.count == 101 and histogram.counts[10] == 99)
+
+    def test_collect_metrics_1(self):
+        atp = ATP(feature_space=self.feature_space, collect_metrics=True).train(self.pairs)
+        guesses = 0
+        for lemma, _, feats in self.test_pairs:
+            _, was_guess = atp.inflect(lemma, feats, return_whether_guess=True)
+            guesses += was_guess
+        snapshot = atp.metrics.snapshot()
+        assert(snapshot['inflections'] == len(self.test_pairs))
+        assert(snapshot['outcomes'][GUESSED] == guesses)
+        assert(snapshot['guess_rate'] == guesses / len(self.test_pairs))
+        assert(sum(snapshot['leaf_hits'].values()) == len(self.test_pairs))
+        assert(sum(snapshot['leaf_guesses'].values()) == guesses)
+        assert(all(name.endswith('No Productive Process') for name in snapshot['leaf_guesses']))
+        assert(snapshot['latency']['inflect']['count'] == len(self.test_pairs))
+        # the training pairs were memorized (or are covered by a productive process)
+        atp.metrics.reset()
+        for lemma, _, feats in self.pairs:
+            atp.inflect(lemma, feats)
+        outcomes = atp.metrics.snapshot()['outcomes']
+        assert(outcomes[GUESSED] == 0 and outcomes[MEMORIZED] > 0)
+        assert(outcomes[MEMORIZED] + outcomes[PRODUCTIVE] == len(self.pairs))
+
+    def test_collect_metrics_2(self):
+        atp = ATP(feature_space=self.feature_space, collect_metrics=True).train(self.pairs)
+        for lemma, _, _ in self.test_pairs:
+            atp.inflect_no_feat(lemma, ())
+        snapshot = atp.metrics.snapshot()
+        assert(sum(snapshot['no_feat_compatible_leaves'].values()) == len(self.test_pairs))
+        def count_compatible_leaves(lemma):
+            count, frontier = 0, [atp.root]
+            while len(frontier) != 0:
+                node = frontier.pop()
+                count += node.num_children() == 0
+                frontier.extend(child for (pos, condition), child in node.get_children() if condition.condition_type == 'Semantic' or pos == condition.applies(lemma, ()))
+            return count
+        def expected_compatible_leaves():
+            return {str(n): count for n, count in sorted(Counter(count_compatible_leaves(lemma) for lemma, _, _ in self.test_pairs).items())}
+        assert(snapshot['no_feat_compatible_leaves'] == expected_compatible_leaves())
+        # the counts kept for each ending are dropped when the tree changes
+        atp.train(self.pairs[:120])
+        atp.metrics.reset()
+        for lemma, _, _ in self.test_pairs:
+            atp.inflect_no_feat(lemma, ())
+        assert(atp.metrics.snapshot()['no_feat_compatible_leaves'] == expected_compatible_leaves())
+        atp = ATP(feature_space=self.feature_space, collect_metrics=True).train(self.pairs)
+        assert(snapshot['no_feat_ambiguous'] == sum(count for n, count in snapshot['no_feat_compatible_leaves'].items() if int(n) > 1))
+        assert(snapshot['latency']['inflect_no_feat']['count'] == len(self.test_pairs))
+        assert(ATP(feature_space=self.feature_space).train(self.pairs).metrics is None) # metrics are off by default
+        # counting the compatible leaves does not change the chosen leaf
+        uncounted = ATP(feature_space=self.feature_space).train(self.pairs)
+        for lemma, _, _ in self.test_pairs:
+            assert(atp.inflect_no_feat(lemma, (), return_whether_guess=True) == uncounted.inflect_no_feat(lemma, (), return_whether_guess=True))
+        # inflections served from the cache are counted as well
+        cached = ATP(feature_space=self.feature_space, cache_size=len(self.test_pairs), collect_metrics=True).train(self.pairs)
+        for _ in range(2):
+            for lemma, _, _ in self.test_pairs:
+                cached.inflect_no_feat(lemma, ())
+        cached_snapshot = cached.metrics.snapshot()
+        assert(cached.cache.info()['hits'] >= len(self.test_pairs))
+        for key in ['inflections', 'no_feat_ambiguous']:
+            assert(cached_snapshot[key] == 2 * snapshot[key])
+        for key in ['outcomes', 'leaf_hits', 'leaf_guesses', 'no_feat_compatible_leaves']:
+            assert(cached_snapshot[key] == {k: 2 * v for k, v in snapshot[key].items()})
+        assert(cached_snapshot['latency']['inflect_no_feat']['count'] == 2 * len(self.test_pairs))
+
+    def test_collect_metrics_3(self):
+        atp = ATP(feature_space=self.feature_space, collect_metrics=True).train(self.pairs)
+        list(atp.inflect_stream(self.test_pairs, batch_size=25))
+        serial = atp.metrics.snapshot()
+        atp.metrics.reset()
+        list(atp.inflect_stream(self.test_pairs, batch_size=25, n_jobs=2))
+        parallel = atp.metrics.snapshot() # the workers' metrics are merged
+        for key in ['inflections', 'outcomes', 'leaf_hits', 'leaf_guesses']:
+            assert(parallel[key] == serial[key])
+        assert(parallel['latency']['inflect_many']['count'] == serial['latency']['inflect_many']['count'] == 4)
+
+    def test_collect_metrics_4(self):
+        # with a cache, inflect counts the same leaves and outcomes as without one, however often the lemmas repeat
+        queries = [pair for pair in self.test_pairs for _ in range(3)] + self.pairs[:50]
+        counts = list()
+        for cache_size in [0, 8, len(queries)]:
+            atp = ATP(feature_space=self.feature_space, cache_size=cache_size, collect_metrics=True).train(self.pairs)
+            for lemma, _, feats in queries:
+                atp.inflect(lemma, feats)
+            snapshot = atp.metrics.snapshot()
+            counts.append({key: snapshot[key] for key in ['inflections', 'outcomes', 'guess_rate', 'leaf_hits', 'leaf_guesses']})
+        assert(counts[0] == counts[1] == counts[2])
+        assert(counts[0]['inflections'] == len(queries))
+
+    def test_pickle_1(self):
+        metrics = InferenceMetrics()
+        metrics.observe_latency('inflect', 1e-4)
+        metrics = pickle.loads(pickle.dumps(metrics))
+        metrics.observe_latency('inflect', 1e-4)
+        assert(metrics.snapshot()['latency']['inflect']['count'] == 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+import pickle
+import sys
+sys.path.append('../src/')
+from inflection_cache import InflectionCache
+
+class TestInflectionCache(unittest.TestCase):
+    def test_get_put_1(self):
+        cache = InflectionCache(maxsize=2)
+        assert(cache.get('a') is None)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert(cache.get('a') == 1)
+        cache.put('c', 3) # evicts 'b', the least recently used entry
+        assert(cache.get('b') is None)
+        assert(cache.get('a') == 1)
+        assert(cache.get('c') == 3)
+        assert(cache.info() == {'hits': 3, 'misses': 2, 'size': 2, 'maxsize': 2})
+
+    def test_clear_1(self):
+        cache = InflectionCache(maxsize=2)
+        cache.put('a', 1)
+        cache.get('a')
+        cache.clear()
+        assert(len(cache) == 0)
+        assert(cache.hits == cache.misses == 0)
+
+    def test_pickle_1(self):
+        cache = InflectionCache(maxsize=5)
+        cache.put('a', 1)
+        cache = pickle.loads(pickle.dumps(cache))
+        assert(cache.maxsize == 5)
+        assert(len(cache) == 0)
+        cache.put('a', 1)
+        assert(cache.get('a') == 1)
+
+if __name__ == "__main__":
+    unittest.main()
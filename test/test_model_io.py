@@ -0,0 +1,124 @@
+import unittest
+import os
+import json
+import tempfile
+import subprocess
+
+import sys
+sys.path.append('../src/')
+from atp import ATP
+from model_io import load_compiled, read
+from utils import load_pairs, load_german_CHILDES
+
+class TestModelIO(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'model.atp')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_save_load_1(self):
+        pairs = [('a', 'a-', ('Noun',)),
+                 ('b', 'b-', ('Noun',)),
+                 ('c', 'c-', ('Noun',)),
+                 ('d', 'd*', ('Noun',)),
+                 ('a', 'a+', ('Verb',)),
+                 ('b', 'b+', ('Verb',)),
+                 ('c', 'c+', ('Verb',)),
+                 ('d', 'd**', ('Verb',))]
+        ATP(feature_space={'Noun', 'Verb'}).train(pairs).save(self.path)
+        atp = ATP.load(self.path)
+        assert(atp.feature_space == ATP(feature_space={'Noun', 'Verb'}).feature_space)
+        assert(len(atp.get_leaves()) == 2)
+        assert(atp.inflect('e', ('Noun',)) == 'e-')
+        assert(atp.inflect('e', ('Verb',)) == 'e+')
+        assert(atp.inflect('d', ('Noun',)) == 'd*')
+        assert(atp.inflect('d', ('Verb',)) == 'd**')
+
+    def test_save_load_2(self):
+        pairs, features = load_german_CHILDES()
+        trained = ATP(feature_space=features).train(pairs)
+        trained.save(self.path)
+        atp = ATP.load(self.path)
+        assert(sorted(leaf.name for leaf in atp.get_leaves()) == sorted(leaf.name for leaf in trained.get_leaves()))
+        for lemma, _, feats in pairs:
+            leaf, trained_leaf = atp.probe(lemma, feats), trained.probe(lemma, feats)
+            assert(leaf.name == trained_leaf.name)
+            assert(leaf.switch_statement.vocab == trained_leaf.switch_statement.vocab)
+            assert(leaf.switch_statement.default_case.lemmas == trained_leaf.switch_statement.default_case.lemmas)
+            assert(atp.inflect(lemma, feats) == trained.inflect(lemma, feats))
+        # saving is deterministic, so the loaded model saves to the same bytes
+        with open(self.path, 'rb') as f:
+            saved = f.read()
+        path = os.path.join(self.dir.name, 'resaved.atp')
+        atp.save(path)
+        with open(path, 'rb') as f:
+            assert(f.read() == saved)
+
+    def test_load_compiled_1(self):
+        for seed in range(3):
+            fname = f'../data/german/quant/train60_{seed}.txt'
+            pairs, feature_space = load_pairs(fname)
+            test_pairs, _ = load_pairs(fname.replace('train60', 'test'))
+            atp = ATP(feature_space=feature_space).train(pairs)
+            atp.save(self.path)
+            for use_mmap in [True, False]:
+                compiled = load_compiled(self.path, use_mmap=use_mmap)
+                assert(compiled.num_nodes() == atp.compile().num_nodes())
+                assert(sorted(compiled.leaf_names) == sorted(atp.compile().leaf_names))
+                for lemma, _, feats in pairs + test_pairs:
+                    assert(compiled.inflect(lemma, feats) == atp.inflect(lemma, feats))
+                    assert(compiled.leaf_names[compiled.probe_leaf(lemma, feats)] == atp.probe(lemma, feats).name)
+
+    def test_load_compiled_2(self):
+        # a loaded model guesses as the trained one does, whatever order its sets are iterated in (which varies with the hash seed)
+        pairs, feature_space = load_pairs('../data/german/quant/train60_0.txt')
+        test_pairs, _ = load_pairs('../data/german/quant/test_0.txt')
+        atp = ATP(feature_space=feature_space).train(pairs)
+        atp.save(self.path)
+        preds = [atp.inflect(lemma, feats, return_whether_guess=True) for lemma, _, feats in test_pairs]
+        assert(any(was_guess for _, was_guess in preds))
+        script = ("import sys, json; sys.path.append('../src/'); from atp import ATP; from model_io import load_compiled; from utils import load_pairs\n"
+                  f"atp, compiled = ATP.load({self.path!r}), load_compiled({self.path!r})\n"
+                  "pairs, _ = load_pairs('../data/german/quant/test_0.txt')\n"
+                  "print(json.dumps([[atp.inflect(lemma, feats), compiled.inflect(lemma, feats)] for lemma, _, feats in pairs]))")
+        for seed in range(8):
+            out = subprocess.run([sys.executable, '-c', script], env=dict(os.environ, PYTHONHASHSEED=str(seed)), capture_output=True, text=True, check=True).stdout
+            assert(json.loads(out) == [[pred, pred] for pred, _ in preds])
+
+    def test_load_compiled_3(self):
+        # the default case of a leaf applies its suffix with phonology
+        pairs = [('wɔk', 'wɔkt', ('PST',)),
+                 ('pleɪ', 'pleɪd', ('PST',)),
+                 ('sprɪnt', 'sprɪntɪd', ('PST',)),
+                 ('ʤʌmp', 'ʤʌmpt', ('PST',)),
+                 ('goʊ', 'wɛnt', ('PST',))]
+        atp = ATP(feature_space={'PST'}, apply_phonology=True).train(pairs)
+        atp.save(self.path)
+        loaded, compiled = ATP.load(self.path), load_compiled(self.path)
+        for lemma in ['wɔk', 'goʊ', 'lʊk', 'pleɪ', 'hʌnt']:
+            assert(loaded.inflect(lemma, ('PST',)) == compiled.inflect(lemma, ('PST',)) == atp.inflect(lemma, ('PST',)))
+        assert(compiled.inflect('goʊ', ('PST',)) == 'wɛnt')
+
+    def test_read_1(self):
+        # the leaves are stored in memory-mapped columns and a shared string blob, not in the header
+        pairs, feature_space = load_pairs('../data/german/quant/train60_0.txt')
+        atp = ATP(feature_space=feature_space).train(pairs)
+        atp.save(self.path)
+        header, columns, strings = read(self.path)
+        assert(set(header) == {'version', 'feature_space', 'apply_phonology', 'conditions', 'bundles', 'lengths'})
+        assert(all(lemma not in json.dumps(header, ensure_ascii=False) for lemma, _, _ in pairs if len(lemma) > 3))
+        assert(len(columns['leaf_productive']) == len(atp.get_leaves()))
+        assert(len(columns['lemmas']) == sum(len(leaf.switch_statement.vocab) for leaf in atp.get_leaves()))
+        assert(type(columns['lemmas']) is memoryview and type(strings.blob) is memoryview)
+        assert({(strings[lemma], strings[inflected]) for lemma, inflected in zip(columns['lemmas'], columns['inflections'])} == {(lemma, inflected) for lemma, inflected, _ in pairs})
+
+    def test_load_1(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a model')
+        with self.assertRaises(ValueError):
+            ATP.load(self.path)
+
+if __name__ == "__main__":
+    unittest.main()
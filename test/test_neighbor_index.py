@@ -0,0 +1,36 @@
+import unittest
+import sys
+sys.path.append('../src/')
+from neighbor_index import NeighborIndex
+from utils import hamming_distance
+
+class TestNeighborIndex(unittest.TestCase):
+    def setUp(self):
+        self.vocab = {('Hund', 'Hunde', ('M',)),
+                      ('Sache', 'Sachen', ('F',)),
+                      ('Tag', 'Tage', ('M',)),
+                      ('Bad', 'Bader', ('N',)),
+                      ('Nadel', 'Nadeln', ('F',))}
+
+    def test_distances_1(self):
+        index = NeighborIndex(self.vocab)
+        for lemma in ['Hand', 'Wache', 'g', 'Kaninchen', '0ag', '']:
+            distances = index.distances(lemma)
+            for (other, _, _), distance in zip(index.entries, distances):
+                assert(distance == hamming_distance(lemma, other))
+
+    def test_nearest_1(self):
+        index = NeighborIndex(self.vocab)
+        assert(index.nearest('Hand')[0] == 'Hund')
+        assert(index.nearest('Wache')[0] == 'Sache')
+        assert(index.nearest('Pudel')[0] == 'Nadel')
+        assert(NeighborIndex(set()).nearest('Hand') is None)
+
+    def test_nearest_2(self):
+        # ties go to the first entry in sorted order, whatever the order of the vocab
+        vocab = [('Bad', 'Bader', ('N',)), ('Tag', 'Tage', ('M',)), ('Rad', 'Rader', ('N',))]
+        assert(NeighborIndex(vocab).nearest('Lab')[0] == 'Bad')
+        assert(NeighborIndex(reversed(vocab)).nearest('Lab')[0] == 'Bad')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import numpy as np
+import sys
+sys.path.append('../src/')
+from pair_store import PairStore
+from semantic_condition import SemanticCondition
+from phonological_condition import PhonologicalCondition
+
+class TestPairStore(unittest.TestCase):
+    def setUp(self):
+        self.pairs = [('Sache', 'Sachen', ('F',)),
+                      ('Nadel', 'Nadeln', ('F',)),
+                      ('Tag', 'Tage', ('M',)),
+                      ('Hund', 'Hunde', ('M',)),
+                      ('Haus', 'Hauser', ('N',))]
+        self.labels = np.array([0, 0, 1, 1, 2]) # +n, +e, +er
+
+    def test_init(self):
+        store = PairStore(self.pairs, self.labels)
+        assert(len(store) == 5)
+        assert(list(store.label_ids) == [0, 0, 1, 1, 2])
+
+    def test_pairs_of_1(self):
+        store = PairStore(self.pairs, self.labels)
+        indices = np.array([4, 0])
+        assert(store.pairs_of(indices) == [self.pairs[4], self.pairs[0]])
+        assert(list(store.label_ids[indices]) == [2, 0])
+        assert(store.pairs_of(indices)[0] is self.pairs[4]) # the pairs are not copied
+
+    def test_mask_1(self):
+        store = PairStore(self.pairs, self.labels)
+        indices = store.all_indices()
+        assert(list(store.mask(SemanticCondition('M'), indices)) == [False, False, True, True, False])
+        assert(list(store.mask(PhonologicalCondition(('e', 'g')), indices[1:])) == [False, True, False, False])
+
+    def test_row_1(self):
+        store = PairStore(self.pairs, self.labels, conditions=[SemanticCondition('F'), SemanticCondition('M')])
+        assert(len(store.condition_rows) == 2)
+        assert(store.row(SemanticCondition('M')) == 1) # conditions are only evaluated once
+        endings = [PhonologicalCondition(f'{c}') for c in 'abcdefghijklmnopqrstuvwxyz'] + [PhonologicalCondition(('us', 'del'))]
+        for condition in endings: # grow the matrix past its initial size
+            store.row(condition)
+        assert(len(store.condition_rows) == 2 + len(endings))
+        indices = store.all_indices()
+        for condition in endings:
+            assert(list(store.mask(condition, indices)) == [condition.applies(lemma, feats) for lemma, _, feats in self.pairs])
+
+    def test_count_applies_1(self):
+        store = PairStore(self.pairs, self.labels)
+        conditions = [SemanticCondition('F'), SemanticCondition('N'), PhonologicalCondition('g')]
+        assert(list(store.count_applies(conditions, store.all_indices())) == [2, 1, 1])
+        assert(list(store.count_applies(conditions, np.array([2, 3]))) == [0, 0, 1])
+
+    def test_split_consistencies_1(self):
+        store = PairStore(self.pairs, self.labels)
+        conditions = [SemanticCondition('F'), SemanticCondition('N'), PhonologicalCondition('g')]
+        for chunk_size in [1, 5, 1 << 24]:
+            consistencies = store.split_consistencies(conditions, store.all_indices(), chunk_size=chunk_size)
+            assert(consistencies.shape == (3, 2))
+            assert(list(consistencies[0]) == [1.0, 2 / 3])
+            assert(list(consistencies[1]) == [1.0, 2 / 4])
+            assert(list(consistencies[2]) == [1.0, 2 / 4])
+        consistencies = store.split_consistencies(conditions, np.array([2, 3]))
+        assert(list(consistencies[0]) == [0, 1.0]) # no pairs have the feature
+
+    def test_consistency_1(self):
+        store = PairStore(self.pairs, self.labels)
+        assert(store.consistency(store.all_indices()) == 2 / 5)
+        assert(store.consistency(np.array([0, 1, 2])) == 2 / 3)
+        assert(store.consistency(np.array([], dtype=int)) == 0)
+
+    def test_vocabs_1(self):
+        store = PairStore(self.pairs, self.labels)
+        assert(store.bundles.items == [('F',), ('M',), ('N',)])
+        assert(list(store.bundle_ids) == [0, 0, 1, 1, 2])
+
+    def test_extend_1(self):
+        conditions = [SemanticCondition('F'), SemanticCondition('N'), PhonologicalCondition('g'), PhonologicalCondition(('us', 'del'))]
+        store = PairStore(self.pairs[:2], self.labels[:2], conditions=conditions[:2])
+        store.row(conditions[2])
+        store.extend(self.pairs[2:3], self.labels[2:3])
+        store.extend(self.pairs[3:], self.labels[3:])
+        store.row(conditions[3]) # evaluated over all of the pairs
+        counted = PairStore(self.pairs, self.labels)
+        assert(len(store) == 5 and list(store.label_ids) == list(counted.label_ids) and list(store.bundle_ids) == list(counted.bundle_ids))
+        indices = store.all_indices()
+        for condition in conditions:
+            assert(list(store.mask(condition, indices)) == list(counted.mask(condition, indices)))
+        assert((store.split_consistencies(conditions, indices) == counted.split_consistencies(conditions, indices)).all())
+        store.relabel(np.array([4]), [1])
+        assert(list(store.label_ids) == [0, 0, 1, 1, 1])
+
+if __name__ == "__main__":
+    unittest.main()
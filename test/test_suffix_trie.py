@@ -0,0 +1,47 @@
+import unittest
+import sys
+sys.path.append('../src/')
+from suffix_trie import SuffixTrie
+from phonological_condition import PhonologicalCondition
+
+class TestSuffixTrie(unittest.TestCase):
+    def test_init(self):
+        trie = SuffixTrie()
+        assert(len(trie) == 0)
+        assert(not trie.matches('Sache'))
+
+    def test_matches_1(self):
+        trie = SuffixTrie(['e', 'del', 'hel'])
+        assert(len(trie) == 3)
+        assert(trie.matches('Sache'))
+        assert(trie.matches('Nadel'))
+        assert(not trie.matches('Kegel'))
+        assert(not trie.matches('el'))
+        assert(not trie.matches(''))
+
+    def test_matches_2(self):
+        trie = SuffixTrie()
+        trie.add('el')
+        trie.add('el')
+        assert(len(trie) == 1)
+        assert(trie.matches('gel'))
+        trie.update(['g', 'r'])
+        assert(trie.matches('Tag'))
+        assert(len(trie) == 3)
+
+    def test_matches_3(self):
+        trie = SuffixTrie([''])
+        assert(trie.matches('anything'))
+
+    def test_phonological_condition_1(self):
+        endings = tuple(f'{a}{b}' for a in 'abcdefg' for b in 'hijklm')
+        condition = PhonologicalCondition(endings)
+        assert(condition.trie is not None)
+        small_condition = PhonologicalCondition(endings[:3])
+        assert(small_condition.trie is None)
+        for lemma in ['ah', 'xgm', 'gmx', 'h', 'ai', 'ain']:
+            assert(condition.applies(lemma, ()) == any(lemma.endswith(e) for e in endings))
+            assert(small_condition.applies(lemma, ()) == any(lemma.endswith(e) for e in endings[:3]))
+
+if __name__ == "__main__":
+    unittest.main()
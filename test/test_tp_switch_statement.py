@@ -1,7 +1,9 @@
 import unittest
+import pickle
 import sys
 sys.path.append('../src/')
 from tp_switch_statement import TPSwitchStatement
+from case import SUFFIX, MEMORIZED
 
 class TestTPSwitchStatement(unittest.TestCase):
     def test_init(self):
@@ -237,5 +239,68 @@ class TestTPSwitchStatement(unittest.TestCase):
         assert(tp.inflect('do', 'tense=PST') == 'did')
         assert(tp.inflect('nudge', 'tense=PST') == 'nudged')
 
+    def test_find_case_1(self):
+        tp = TPSwitchStatement()
+        tp.train([('walk', 'walked', 'tense=PST'), ('shoot', 'shot', 'tense=PST'), ('jump', 'jumped', 'tense=PST')])
+        assert(tp.find_case('talk', 'talked') is tp.suffix_cases['ed'])
+        assert(tp.find_case('shoot', 'shot').kind == MEMORIZED)
+        assert(tp.find_case('talk', 'talks') is None)
+        assert(tp.find_case('shoot', 'shoots') is None)
+        assert([case.kind for case in tp.cases] == [SUFFIX, MEMORIZED]) # the most recently hit case comes first
+        assert(tp.cases[0].lemmas == {('walk', 'tense=PST'), ('jump', 'tense=PST')})
+
+    def test_pickle_1(self):
+        tp = TPSwitchStatement(pairs=[('walk', 'walked', 'tense=PST'), ('shoot', 'shot', 'tense=PST')])
+        tp = pickle.loads(pickle.dumps(tp))
+        assert(tp.inflect('walk', 'tense=PST') == 'walked')
+        assert(tp.inflect('shoot', 'tense=PST') == 'shot')
+        tp.train_on_pair('talk', 'talked', 'tense=PST')
+        assert(len(tp.cases) == 2)
+
+    def test_lookup_1(self):
+        tp = TPSwitchStatement(pairs=[('walk', 'walked', 'tense=PST'), ('shoot', 'shot', 'tense=PST'), ('jump', 'jumped', 'tense=PST')])
+        assert(tp.lookup('shoot', 'tense=PST') is tp.memorized_cases[('shoot', 'shot')])
+        assert(tp.lookup('shoot', 'tense=PRS') is None)
+        assert(tp.get_case('talk', 'tense=PST') is tp.default_case)
+        assert(tp.inflect_known('walk', 'tense=PST') == 'walked')
+        assert(tp.inflect_known('talk', 'tense=PST') is None) # not productive, so it would be guessed
+        # a productive case that became the default is not part of the switch statement's cases
+        productive = tp.suffix_cases['ed']
+        tp.default_case = productive
+        tp.remove_case(productive)
+        tp.productive = True
+        assert(not tp.memorized('walk', 'tense=PST'))
+        assert(tp.get_case('walk', 'tense=PST') is productive)
+        assert(tp.inflect_known('talk', 'tense=PST') == 'talked')
+
+    def test_lookup_2(self):
+        # an ambiguous lemma is resolved by the order of the cases
+        tp = TPSwitchStatement(pairs=[('dream', 'dreamt', 'tense=PST'), ('dream', 'dreamed', 'tense=PST')])
+        assert(tp.get_case('dream', 'tense=PST').name == 'inflected = lemma + t')
+        tp.train_on_pair('dream', 'dreamed', 'tense=PST') # brings the -ed case to the front
+        assert(tp.get_case('dream', 'tense=PST').name == 'inflected = lemma + ed')
+
+    def test_case_order_1(self):
+        tp = TPSwitchStatement(pairs=[('walk', 'walked', 'tense=PST'), ('shoot', 'shot', 'tense=PST'), ('run', 'ran', 'tense=PST')])
+        assert([case.name for case in tp.cases] == ['inflected = lemma + ed', 'inflected = shot', 'inflected = ran']) # new cases go to the end
+        tp.train_on_pair('shoot', 'shot', 'tense=PST') # a hit case goes to the front
+        assert([case.name for case in tp.cases] == ['inflected = shot', 'inflected = lemma + ed', 'inflected = ran'])
+        ed = tp.suffix_cases['ed']
+        assert(tp.remove_case(ed) == 1)
+        assert([case.name for case in tp.cases] == ['inflected = shot', 'inflected = ran'])
+        tp.insert_case(1, ed)
+        assert([case.name for case in tp.cases] == ['inflected = shot', 'inflected = lemma + ed', 'inflected = ran'])
+        tp.train_on_pair('jump', 'jumped', 'tense=PST')
+        assert([case.name for case in tp.cases] == ['inflected = lemma + ed', 'inflected = shot', 'inflected = ran'])
+
+    def test_label_1(self):
+        # each case is labeled with the id of its name when it is added, so cases with the same name share a label
+        tp = TPSwitchStatement(pairs=[('walk', 'walked', 'tense=PST'), ('go', 'went', 'tense=PST'), ('wend', 'went', 'tense=PST'), ('jump', 'jumped', 'tense=PST')])
+        assert([case.label for case in tp.cases] == [0, 1, 1])
+        assert(tp.get_case('go', 'tense=PST').label == tp.get_case('wend', 'tense=PST').label)
+        assert(tp.get_case('go', 'tense=PST') is not tp.get_case('wend', 'tense=PST'))
+        assert(tp.label_vocab.items == ['inflected = lemma + ed', 'inflected = went'])
+        assert(tp.suffix_cases['ed'].payload is sys.intern('ed'))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
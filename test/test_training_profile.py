@@ -0,0 +1,56 @@
+import unittest
+import os
+import json
+import tempfile
+
+import sys
+sys.path.append('../src/')
+from atp import ATP
+from training_profile import TrainingProfile, PHASES
+from utils import load_pairs
+
+class TestTrainingProfile(unittest.TestCase):
+    def setUp(self):
+        self.pairs, self.feature_space = load_pairs('../data/german/quant/train360_0.txt')
+
+    def test_profile_1(self):
+        profile = TrainingProfile()
+        atp = ATP(feature_space=self.feature_space).train(self.pairs, profile=profile)
+        assert(atp.profile is None) # the profile is only attached while training
+        assert(set(profile.steps) == {'labels', 'pair_store', 'build_tree', 'summarize'})
+        # one NodeProfile per node, in pre-order
+        leaves = atp.get_leaves()
+        assert(sum(node.leaf for node in profile.nodes) == len(leaves))
+        root = profile.nodes[0]
+        assert(root.path == '' and root.depth == 0 and root.num_pairs == len(self.pairs) and not root.leaf)
+        assert(root.num_split_options > 0)
+        for node in profile.nodes:
+            phases = node.to_dict()['phases']
+            assert(set(phases) == set(PHASES) | {'other'})
+            assert(sum(phases.values()) >= node.seconds - 1e-9)
+        assert(profile.hot_nodes(3) == sorted(profile.nodes, key=lambda node: node.seconds, reverse=True)[:3])
+
+    def test_profile_2(self):
+        serial, parallel = TrainingProfile(), TrainingProfile()
+        ATP(feature_space=self.feature_space).train(self.pairs, profile=serial)
+        ATP(feature_space=self.feature_space).train(self.pairs, n_jobs=2, parallel_depth=1, profile=parallel)
+        # the subtrees built by workers are profiled too
+        assert(sorted((node.path, node.num_pairs, node.num_split_options) for node in parallel.nodes) == \
+               sorted((node.path, node.num_pairs, node.num_split_options) for node in serial.nodes))
+
+    def test_save_1(self):
+        profile = TrainingProfile()
+        ATP(feature_space=self.feature_space).train(self.pairs, profile=profile)
+        with tempfile.TemporaryDirectory() as dir:
+            path = os.path.join(dir, 'profile.json')
+            profile.save(path)
+            with open(path, 'r') as f:
+                saved = json.load(f)
+        assert(len(saved['nodes']) == len(profile.nodes))
+        assert(saved['nodes'][0]['num_pairs'] == len(self.pairs))
+        assert(set(saved['phase_totals']) == set(PHASES) | {'other'})
+        summary = profile.summary(k=2)
+        assert('phonological_features' in summary and '(root)' in summary)
+
+if __name__ == "__main__":
+    unittest.main()
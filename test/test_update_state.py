@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+
+import sys
+sys.path.append('../src/')
+from atp import ATP
+from pair_store import PairStore
+from tp_switch_statement import TPSwitchStatement
+from semantic_condition import SemanticCondition
+from phonological_condition import PhonologicalCondition
+from update_state import UpdateState, NodeState
+from utils import load_pairs
+
+class TestUpdateState(unittest.TestCase):
+    def setUp(self):
+        self.pairs, self.feature_space = load_pairs('../data/german/quant/train360_0.txt')
+
+    def test_add_1(self):
+        atp = ATP(feature_space=self.feature_space)
+        pairs = self.pairs[:200]
+        state = UpdateState(PairStore(list(pairs), atp.build_labels(pairs)), TPSwitchStatement(pairs=pairs))
+        # Sache is seen again with another inflection, which relabels the first Sache if its new case comes first in the switch statement
+        lemma, inflected, feats = next(pair for pair in pairs if pair[0] == 'Sache')
+        new_pairs = [(lemma, f'{inflected}x', feats), (lemma, f'{inflected}x', feats)] + self.pairs[200:]
+        relabeled = state.add(new_pairs)
+        assert(list(state.store.label_ids) == list(atp.build_labels(pairs + new_pairs)))
+        assert(list(relabeled) == list(np.nonzero(atp.build_labels(pairs) != state.store.label_ids[:len(pairs)])[0]))
+        assert(len(state.add([])) == 0)
+
+    def test_count_1(self):
+        store = PairStore(list(self.pairs[:100]), ATP(feature_space=self.feature_space).build_labels(self.pairs[:100]))
+        conditions = [SemanticCondition('F'), SemanticCondition('M'), PhonologicalCondition('e')]
+        state = NodeState('', conditions)
+        state.count(store, store.all_indices(), set(conditions))
+        store.extend(self.pairs[100:], ATP(feature_space=self.feature_space).build_labels(self.pairs)[100:])
+        conditions = conditions[1:] + [PhonologicalCondition('el')] # drop one condition and add another
+        state.count(store, store.all_indices(), set(conditions))
+        indices = store.all_indices()
+        assert(list(state.count_applies(conditions)) == list(store.count_applies(conditions, indices)))
+        assert((state.split_consistencies(conditions) == store.split_consistencies(conditions, indices)).all())
+        assert(SemanticCondition('F') not in state.condition_rows)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,8 @@
 import unittest
 import sys
+import numpy as np
 sys.path.append('../src/')
-from utils import load_pairs, most_freq, load_word_to_ipa
+from utils import load_pairs, iter_pairs, remove_umlauts, iter_batches, most_freq, load_word_to_ipa, hamming_distance, hamming_distances, encode_words
 
 class TestUtils(unittest.TestCase):
     def test_load_pairs_1(self):
@@ -46,6 +47,26 @@ class TestUtils(unittest.TestCase):
         assert(pairs[0] == ('pritɛnd', 'pritɛndɪŋ', ('V', 'V.PTCP', 'PRS')))
         assert(pairs[-1] == ('it', 'eɪt', ('V', 'PST')))
 
+    def test_load_pairs_7(self):
+        fname = '../data/german/quant/train60_0.txt'
+        pairs, features = load_pairs(fname)
+        (lemmas, inflections, bundle_ids, bundles), columnar_features = load_pairs(fname, columnar=True)
+        assert(type(lemmas) is np.ndarray and lemmas.dtype == object)
+        assert(type(inflections) is np.ndarray and inflections.dtype == object)
+        assert(type(bundle_ids) is np.ndarray and bundle_ids.dtype.kind == 'i')
+        assert(len(lemmas) == len(inflections) == len(bundle_ids) == len(pairs))
+        assert(len(set(bundles)) == len(bundles) == len(set(feats for _, _, feats in pairs)))
+        assert(list(zip(lemmas, inflections, [bundles[i] for i in bundle_ids])) == pairs)
+        assert(columnar_features == features)
+        # rows with the same features share one tuple
+        assert(all(f is pairs[0][2] for _, _, f in pairs if f == pairs[0][2]))
+
+    def test_remove_umlauts_1(self):
+        assert(remove_umlauts('Ärmel') == 'Armel')
+        assert(remove_umlauts('Bäume') == 'Baume')
+        assert(remove_umlauts('Hund') == 'Hund')
+        assert(remove_umlauts('') == '')
+
     def test_most_freq_1(self):
         assert(most_freq([1, 2, 1, 3, 4, 1, 1]) == 1)
 
@@ -61,5 +82,40 @@ class TestUtils(unittest.TestCase):
     def test_most_freq_5(self):
         assert(most_freq(['a', 'b', 'b', 'c']) == 'b')
 
+    def test_hamming_distance_1(self):
+        assert(hamming_distance('Hund', 'Hand') == 0.25)
+        assert(hamming_distance('Tag', 'Betrag') == 4 / 6) # the words are right-aligned
+        assert(hamming_distance('ag', '0ag') == 0) # the shorter word is padded with '0'
+        assert(hamming_distance('abc', 'xyz') == 1)
+
+    def test_hamming_distances_1(self):
+        candidates = ['Hand', 'Betrag', 'Tag', '', 'Wand']
+        for word in ['Hund', 'Tag', 'Kaninchen', 'g']:
+            distances = hamming_distances(word, candidates)
+            assert(list(distances) == [hamming_distance(word, candidate) for candidate in candidates])
+            assert(list(hamming_distances(word, encode_words(candidates))) == list(distances))
+        assert(hamming_distances('Hund', candidates, argmin=True) == 0)
+        assert(hamming_distances('Land', candidates, argmin=True) == 0) # ties go to the first candidate
+        assert(hamming_distances('Hund', [], argmin=True) is None)
+
+    def test_encode_words_1(self):
+        codes, lengths = encode_words(['ab', 'c'])
+        assert(codes.tolist() == [[ord('a'), ord('b')], [ord('0'), ord('c')]])
+        assert(lengths.tolist() == [2, 1])
+        codes, _ = encode_words(['ab'], width=3)
+        assert(codes.tolist() == [[ord('0'), ord('a'), ord('b')]])
+
+    def test_iter_pairs_1(self):
+        fname = '../data/german/quant/train60_0.txt'
+        pairs, _, freqs = load_pairs(fname, with_freq=True)
+        stream = iter_pairs(fname)
+        assert(next(stream) == ('Sache', 'Sachen', ('F',)))
+        assert([('Sache', 'Sachen', ('F',))] + list(stream) == pairs)
+        assert(list(iter_pairs(fname, with_freq=True)) == list(zip(pairs, freqs)))
+
+    def test_iter_batches_1(self):
+        assert(list(iter_batches(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]])
+        assert(list(iter_batches([], 3)) == [])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
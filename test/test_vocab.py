@@ -0,0 +1,32 @@
+import unittest
+import sys
+sys.path.append('../src/')
+from vocab import Vocab
+
+class TestVocab(unittest.TestCase):
+    def test_add_1(self):
+        vocab = Vocab()
+        assert(vocab.add('+n') == 0)
+        assert(vocab.add('+e') == 1)
+        assert(vocab.add('+n') == 0) # ids are stable
+        assert(len(vocab) == 2)
+        assert(vocab[1] == '+e')
+        assert('+e' in vocab and '+er' not in vocab)
+
+    def test_get_1(self):
+        vocab = Vocab(['+n', '+e'])
+        assert(vocab.get('+e') == 1)
+        assert(vocab.get('+er') is None)
+        assert(len(vocab) == 2) # get does not add items
+
+    def test_ids_1(self):
+        vocab = Vocab()
+        labels = ['+n', '+e', '+n', '+er', '+e']
+        ids = vocab.ids(labels)
+        assert(list(ids) == [0, 1, 0, 2, 1])
+        assert([vocab[i] for i in ids] == labels)
+        assert(list(vocab.ids([('F',), ('M',), ('F',)])) == [3, 4, 3]) # any hashable items can be mapped
+        assert(len(vocab.ids([])) == 0)
+
+if __name__ == "__main__":
+    unittest.main()
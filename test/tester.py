@@ -3,6 +3,19 @@ from test_utils import TestUtils
 from test_tp_switch_statement import TestTPSwitchStatement
 from test_phon_engine import TestPhonEngine
 from test_atp import TestATP
+from test_compiled_atp import TestCompiledATP
+from test_suffix_trie import TestSuffixTrie
+from test_ending_statistics import TestEndingStatistics
+from test_pair_store import TestPairStore
+from test_condition import TestCondition
+from test_model_io import TestModelIO
+from test_neighbor_index import TestNeighborIndex
+from test_inflection_cache import TestInflectionCache
+from test_vocab import TestVocab
+from test_experiments import TestExperiments
+from test_training_profile import TestTrainingProfile
+from test_inference_metrics import TestInferenceMetrics
+from test_update_state import TestUpdateState
 
 '''
 A script to run all the test cases.
@@ -12,10 +25,36 @@ test_utils_suite = unittest.TestLoader().loadTestsFromTestCase(TestUtils)
 test_tp_switch_statement_suite = unittest.TestLoader().loadTestsFromTestCase(TestTPSwitchStatement)
 test_phon_engine_suite = unittest.TestLoader().loadTestsFromTestCase(TestPhonEngine)
 test_atp_suite = unittest.TestLoader().loadTestsFromTestCase(TestATP)
+test_compiled_atp_suite = unittest.TestLoader().loadTestsFromTestCase(TestCompiledATP)
+test_suffix_trie_suite = unittest.TestLoader().loadTestsFromTestCase(TestSuffixTrie)
+test_ending_statistics_suite = unittest.TestLoader().loadTestsFromTestCase(TestEndingStatistics)
+test_pair_store_suite = unittest.TestLoader().loadTestsFromTestCase(TestPairStore)
+test_condition_suite = unittest.TestLoader().loadTestsFromTestCase(TestCondition)
+test_model_io_suite = unittest.TestLoader().loadTestsFromTestCase(TestModelIO)
+test_neighbor_index_suite = unittest.TestLoader().loadTestsFromTestCase(TestNeighborIndex)
+test_inflection_cache_suite = unittest.TestLoader().loadTestsFromTestCase(TestInflectionCache)
+test_vocab_suite = unittest.TestLoader().loadTestsFromTestCase(TestVocab)
+test_experiments_suite = unittest.TestLoader().loadTestsFromTestCase(TestExperiments)
+test_training_profile_suite = unittest.TestLoader().loadTestsFromTestCase(TestTrainingProfile)
+test_inference_metrics_suite = unittest.TestLoader().loadTestsFromTestCase(TestInferenceMetrics)
+test_update_state_suite = unittest.TestLoader().loadTestsFromTestCase(TestUpdateState)
 # combine the test suites
 suites = unittest.TestSuite([test_utils_suite,
                              test_tp_switch_statement_suite,
                              test_phon_engine_suite,
-                             test_atp_suite])
+                             test_atp_suite,
+                             test_compiled_atp_suite,
+                             test_suffix_trie_suite,
+                             test_ending_statistics_suite,
+                             test_pair_store_suite,
+                             test_condition_suite,
+                             test_model_io_suite,
+                             test_neighbor_index_suite,
+                             test_inflection_cache_suite,
+                             test_vocab_suite,
+                             test_experiments_suite,
+                             test_training_profile_suite,
+                             test_inference_metrics_suite,
+                             test_update_state_suite])
 # run the test suites
 unittest.TextTestRunner(verbosity=2).run(suites)